@@ -21,11 +21,24 @@ Corona Virus Tracker:
 """
 import re
 import Grab_Dates as datez
-import difflib
 from io import StringIO
 import matplotlib.pyplot as plt
 from datetime import date, timedelta, datetime
+from pathlib import Path
 import pandas
+from schema_registry import SCHEMA_REGISTRY_FILE, SchemaRegistry
+
+DATA_DIR = Path("us_covid_data")
+_schema_registry = None
+
+
+def schema_registry():
+    """ Header layouts seen so far, saved under DATA_DIR so unknown column
+    names are only fuzzy-matched once; loaded on first use, not at import """
+    global _schema_registry
+    if _schema_registry is None:
+        _schema_registry = SchemaRegistry(DATA_DIR / SCHEMA_REGISTRY_FILE)
+    return _schema_registry
 
 """Add a function to look at latest text file created and start from that
 date.
@@ -96,33 +109,18 @@ class Corona(object):
         return dataframe
 
 
-    def replace_columns(prev_df, updated_df, updated_column=""):
-        """ Repalce certain columns I know need to be replaced, whenever they pop up during the loop """
-        if 'Case-Fatality_Ratio' in updated_df.columns:
-            updated_df.rename(columns={'Case-Fatality_Ratio': 'Case_Fatality_Ratio'}, inplace=True)
-
-        if 'Incident_Rate' in updated_df.columns:
-            updated_df.rename(columns={'Incident_Rate': 'Incidence_Rate'}, inplace=True)
-        """ Compare column headers, replacing ones that closely match the columns
-        of the new dataframe with the old column headers """
-        if len(prev_df.columns) < len(updated_df.columns):
-            for new_col in updated_df.columns:
-
-                for old_col in prev_df.columns:
-                    seq = difflib.SequenceMatcher(None, old_col, new_col).ratio() * 100
-
-                    if new_col in prev_df.columns:
-                        continue
-
-                    if seq >= 54:
-                        updated_column = re.sub(old_col, new_col, old_col)
-                        prev_df.rename(columns={old_col: updated_column}, inplace=True)
+    def replace_columns(prev_df, updated_df):
+        """ Rename the columns of both frames to their canonical names with the
+        plan registered for each header layout, so drifted names are resolved once
+        per layout instead of comparing every old and new column for every day """
+        for frame in (prev_df, updated_df):
+            plan = schema_registry().plan_for(list(frame.columns))
+            frame.rename(columns=plan['renames'], inplace=True)
 
-        """ Once the altered column headers have replaced the old ones, find
-        location of missing column headers and insert them accordingly  """
-        if len(prev_df.columns) != len(updated_df.columns):
-                if col not in prev_df.columns:
-                    prev_df.insert(idx, column=col, value="")
+        """ Find location of missing column headers and insert them accordingly  """
+        for idx, col in enumerate(updated_df.columns):
+            if col not in prev_df.columns:
+                prev_df.insert(min(idx, len(prev_df.columns)), column=col, value="")
 
     def get_state_data(df, state, local=False):
         df = df.loc[df['Confirmed'] != 0]
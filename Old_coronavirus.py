@@ -1,9 +1,7 @@
 #!/usr/bin/env python3
 # This needs to be refactored... BADLY
 # Also needs Chrome Driver installed for web scraping.
-import difflib
 import os
-import re
 import smtplib
 import ssl
 import time
@@ -12,6 +10,7 @@ from datetime import date, timedelta, datetime
 #from email.mime.multipart import MIMEMultipart
 #from email.mime.text import MIMEText
 from io import StringIO
+from pathlib import Path
 import matplotlib.pyplot as plt
 import pandas as pd
 from selenium import webdriver
@@ -23,6 +22,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import StaleElementReferenceException
 from selenium.webdriver.common.action_chains import ActionChains
+from frame_accumulator import FrameAccumulator
+from schema_registry import SCHEMA_REGISTRY_FILE, SchemaRegistry
 # /\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\
 
 # ====================GET DATES===============================
@@ -63,34 +64,24 @@ def missing_values(dataframe):
 
 # ============= MANAGING VARIATIONS IN COLUMN NAMES =====
 
-def replace_columns(prev_df, updated_df, updated_column=""):
-    """ Repalce certain columns I know need to be replaced, whenever they pop up during the loop """
-    if 'Case-Fatality_Ratio' in updated_df.columns:
-        updated_df.rename(columns={'Case-Fatality_Ratio': 'Case_Fatality_Ratio'}, inplace=True)
-
-    if 'Incident_Rate' in updated_df.columns:
-        updated_df.rename(columns={'Incident_Rate': 'Incidence_Rate'}, inplace=True)
-    """ Compare column headers, replacing ones that closely match the columns
-    of the new dataframe with the old column headers """
-    if len(prev_df.columns) < len(updated_df.columns):
-        for new_col in updated_df.columns:
-
-            for old_col in prev_df.columns:
-                seq = difflib.SequenceMatcher(None, old_col, new_col).ratio() * 100
-
-                if new_col in prev_df.columns:
-                    continue
-
-                if seq >= 54:
-                    updated_column = re.sub(old_col, new_col, old_col)
-                    prev_df.rename(columns={old_col: updated_column}, inplace=True)
-
-    """ Once the altered column headers have replaced the old ones, find
-    location of missing column headers and insert them accordingly  """
-    if len(prev_df.columns) != len(updated_df.columns):
-            if col not in prev_df.columns:
-                prev_df.insert(idx, column=col, value="")
-#                print("New column: " + col + "\nAt index: " + str(idx))
+DATA_DIR = Path("us_covid_data")
+_schema_registry = None
+
+def schema_registry():
+    """ Header layouts seen so far, saved under DATA_DIR so unknown column
+    names are only fuzzy-matched once; loaded on first use, not at import """
+    global _schema_registry
+    if _schema_registry is None:
+        _schema_registry = SchemaRegistry(DATA_DIR / SCHEMA_REGISTRY_FILE)
+    return _schema_registry
+
+def replace_columns(updated_df):
+    """ Rename the columns of a day's frame to their canonical names with the
+    plan registered for its header layout, so drifted names are resolved once
+    per layout instead of comparing every old and new column for every day.
+    Columns a day does not have are filled in when the days are combined. """
+    plan = schema_registry().plan_for(list(updated_df.columns))
+    updated_df.rename(columns=plan['renames'], inplace=True)
 
 # =======================================================
 
@@ -171,9 +162,10 @@ def scrape(path_to_click):
     waiting = WebDriverWait(driver, 17, ignored_exceptions=ignored_exceptions)
 
 #    df = pd.DataFrame([], columns=new_columns)
-    df = pd.DataFrame([])
+    dates = get_dates(start_date, final_date)
+    days = FrameAccumulator(expected_frames=len(dates))
 
-    for dt in get_dates(start_date, final_date):
+    for dt in dates:
 
 # MAIN PART
 #==============================================================
@@ -208,37 +200,25 @@ def scrape(path_to_click):
         raw_data = StringIO(raw)
 
     # Scraping done, and now for Data Wrangling! =====================
-        if dt != start_date:
-            df2 = pd.read_csv(raw_data)
-            df2 = missing_values(df2)
-            replace_columns(df, df2)
-
-            if 'Last_Update' in df2.columns:
-                df2['Last_Update'] = pd.to_datetime(df2['Last_Update'])
+        df1 = pd.read_csv(raw_data)
+        df1 = missing_values(df1)
+        replace_columns(df1)
 
-            elif 'Last Update' in df2.columns:
-                df2['Last Update'] = pd.to_datetime(df2['Last Update'])
-
-            try:
-                df = pd.concat([df, df2], axis=0, ignore_index=True)
-            except Exception as err:
-                print(f"Error: \n{err}")
-
-        else:
-            df1 = pd.read_csv(raw_data)
-            df1 = missing_values(df1)
-
-            try:
-                if 'Last Update' in df1.columns:
-                    df1['Last Update'] = pd.to_datetime(df1['Last Update'])
+        try:
+            if 'Last_Update' in df1.columns:
+                df1['Last_Update'] = pd.to_datetime(df1['Last_Update'])
 
-                elif 'Last_Update' in df1.columns:
-                    df1['Last_Update'] = pd.to_datetime(df1['Last_Update'])
+            elif 'Last Update' in df1.columns:
+                df1['Last Update'] = pd.to_datetime(df1['Last Update'])
 
-            except Exception as err:
-                print(f"Error occurred! => {err}")
+        except Exception as err:
+            print(f"Error occurred! => {err}")
 
-            df = pd.concat([df, df1], axis=0, ignore_index=True)
+        # Copied into the combined columns right away, so each day's frame can be dropped
+        try:
+            days.append(df1)
+        except Exception as err:
+            print(f"Error: \n{err}")
 
         time.sleep(.5)
         driver.back()
@@ -247,7 +227,7 @@ def scrape(path_to_click):
         time.sleep(.5)
 #==============================================================
 
-    return df
+    return days.to_frame()
 
 # =======================================================
 
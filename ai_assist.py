@@ -22,6 +22,23 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
+from categories import CATEGORY_DICTIONARY_FILE, CategoryDictionary
+from combined_dataset import DEFAULT_COMBINED_FORMAT, CombinedStore
+from csv_schema import (
+    DEFAULT_PARSE_ENGINE, PROCESSING_VERSION, normalize_daily_frame, read_daily_csv, resolve_parse_engine
+)
+from frame_accumulator import FrameAccumulator
+from frame_cache import content_hash
+from frame_memory import MemoryReport, downcast_frame
+from mongo_sink import MongoSink
+from raw_store import check_compression, find_raw, open_raw, raw_path
+from raw_validation import HeaderValidator, quarantine
+from retry_policy import FetchMetrics
+from schema_registry import SCHEMA_REGISTRY_FILE, SchemaRegistry
+from state_index import StateSeriesIndex
+from timeseries_store import TIMESERIES_STORE_FILE, TimeSeriesStore
+from timestamp_formats import TimestampFormatRegistry
+
 # Web scraping
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -62,6 +79,7 @@ logger = logging.getLogger("covid_tracker")
 GITHUB_URL = "https://github.com/CSSEGISandData/COVID-19"
 DATA_DIR = Path("covid_data")
 GRAPH_DIR = Path("covid_graphs")
+COMBINED_STORE_NAME = "covid_combined"
 DEFAULT_TIMEOUT = 10  # seconds
 
 
@@ -77,7 +95,15 @@ class CovidTracker:
         browser: str = "firefox",
         headless: bool = True,
         driver_path: str = None,
-        timeout: int = DEFAULT_TIMEOUT
+        timeout: int = DEFAULT_TIMEOUT,
+        raw_compression: Optional[str] = None,
+        parse_engine: str = DEFAULT_PARSE_ENGINE,
+        compact_strings: bool = False,
+        memory_budget_mb: Optional[float] = None,
+        combined_format: str = DEFAULT_COMBINED_FORMAT,
+        partition_by_state: bool = False,
+        use_store: bool = True,
+        use_mongo: bool = False
     ):
         """
         Initialize the COVID tracker.
@@ -91,14 +117,40 @@ class CovidTracker:
             headless: Whether to run browser in headless mode
             driver_path: Path to WebDriver executable (optional if webdriver-manager is installed)
             timeout: Default timeout for WebDriver operations in seconds
+            raw_compression: Store scraped raw CSVs compressed ('gzip' or 'zstd')
+            parse_engine: CSV parser: 'pyarrow', 'c' (pandas), or 'auto' to use pyarrow when installed
+            compact_strings: Store the label columns of the combined data as categoricals
+                sharing one saved category dictionary
+            memory_budget_mb: Downcast the numeric columns of the loaded data to the
+                narrowest safe type and report the bytes saved and peak RSS against
+                this budget (the combined store and the sinks keep full precision)
+            combined_format: How the combined store (covid_combined in the data
+                directory, which every run appends its new days to) is kept:
+                'parquet' (a dataset partitioned by report month) or 'csv'
+            partition_by_state: Also partition the Parquet dataset by state
+            use_store: Keep every processed day in an indexed SQLite time series store
+            use_mongo: Also write every processed day to MongoDB, configured by the
+                COVID_MONGO_* environment variables
         """
         self.timeout = timeout
+        check_compression(raw_compression)
+        self.raw_compression = raw_compression
+        self.parse_engine = resolve_parse_engine(parse_engine)
+        self.timestamp_formats = TimestampFormatRegistry()
+        self.metrics = FetchMetrics()
 
         # Setup directories
         self.data_dir = data_dir
         self.graph_dir = graph_dir
         self.data_dir.mkdir(exist_ok=True)
         self.graph_dir.mkdir(exist_ok=True)
+        self.schema_registry = SchemaRegistry(self.data_dir / SCHEMA_REGISTRY_FILE)
+        self.header_validator = HeaderValidator(self.schema_registry)
+        self.category_dictionary = CategoryDictionary(self.data_dir / CATEGORY_DICTIONARY_FILE) if compact_strings else None
+        self.memory_report = MemoryReport(memory_budget_mb) if memory_budget_mb else None
+        self.combined_store = CombinedStore(self.data_dir / COMBINED_STORE_NAME, combined_format, partition_by_state)
+        self.store = TimeSeriesStore(self.data_dir / TIMESERIES_STORE_FILE, PROCESSING_VERSION) if use_store else None
+        self.mongo_sink = MongoSink.from_env(version=PROCESSING_VERSION) if use_mongo else None
 
         # Setup dates
         self.today = date.today()
@@ -131,6 +183,7 @@ class CovidTracker:
 
         # Initialize data storage
         self.data = pd.DataFrame()
+        self._state_index: Optional[StateSeriesIndex] = None
 
         # For debugging
         self.debug_mode = True
@@ -140,7 +193,7 @@ class CovidTracker:
     def _find_last_processed_date(self) -> Optional[date]:
         """Find the most recent date for which we have processed data"""
         try:
-            csv_files = list(self.data_dir.glob("*.csv"))
+            csv_files = list(self.data_dir.glob("*.csv")) + list(self.data_dir.glob("*.csv.*"))
             if not csv_files:
                 return None
 
@@ -395,6 +448,23 @@ class CovidTracker:
                 pass
             return False
 
+    def _read_cached(self, date_str: str) -> Optional[str]:
+        """Raw CSV content saved by an earlier scrape, or None if there is no valid cached file"""
+        cached_path = find_raw(self.data_dir / f"covid_{date_str.replace('-', '_')}.csv")
+        # An invalid file is left for scrape_date to quarantine and scrape again
+        if cached_path is None or self.header_validator.check(cached_path) is not None:
+            return None
+        with open_raw(cached_path, 'rt') as f:
+            return f.read()
+
+    def _already_stored(self, date_str: str, digest: str) -> bool:
+        """Whether the combined store and every enabled sink hold a day as processed from this content"""
+        if self.combined_store.content_hash(date_str) != f"v{PROCESSING_VERSION}_{digest}":
+            return False
+        if self.store is not None and self.store.missing_days({date_str: digest}):
+            return False
+        return self.mongo_sink is None or not self.mongo_sink.missing_days({date_str: digest})
+
     def scrape_date(self, date_str: str) -> Optional[str]:
         """
         Scrape data for a specific date and return the raw CSV content.
@@ -408,11 +478,18 @@ class CovidTracker:
         """
         logger.info(f"Scraping data for {date_str}")
 
-        # Check if we already have the file
+        # Check if we already have the file, plain or compressed
         csv_path = self.data_dir / f"covid_{date_str.replace('-', '_')}.csv"
-        if csv_path.exists():
-            logger.info(f"Data for {date_str} already exists, skipping")
-            return None
+        cached_path = find_raw(csv_path)
+        if cached_path:
+            # A page captured instead of the raw file is not data; move it aside and scrape again
+            reason = self.header_validator.check(cached_path)
+            if reason is None:
+                logger.info(f"Data for {date_str} already exists, skipping")
+                return None
+            logger.warning(f"Cached file for {date_str} is not a daily report ({reason}), quarantining it for refetch")
+            quarantine(cached_path)
+            self.metrics.increment('quarantined_files')
 
         try:
             # Get the direct URL to the raw content if possible
@@ -427,12 +504,12 @@ class CovidTracker:
 
                 # Check if we got raw content
                 body_text = self.driver.find_element(By.TAG_NAME, "body").text
-                if body_text and "404" not in body_text and "Not Found" not in body_text:
+                if body_text and self.header_validator.check(body_text) is None:
                     logger.info("Successfully retrieved raw content directly")
                     raw_content = body_text
 
                     # Save raw content to file
-                    with open(csv_path, 'w', encoding='utf-8') as f:
+                    with open_raw(raw_path(csv_path, self.raw_compression), 'wt', self.raw_compression) as f:
                         f.write(raw_content)
 
                     # Go back to the listing
@@ -677,8 +754,15 @@ class CovidTracker:
                 logger.warning("Could not extract raw content")
                 return None
 
+            # Only the header is checked, so a GitHub page is rejected before it is saved or parsed
+            reason = self.header_validator.check(raw_content)
+            if reason is not None:
+                logger.warning(f"Content scraped for {date_str} is not a daily report ({reason})")
+                self.metrics.increment('invalid_downloads')
+                return None
+
             # Save raw content to file
-            with open(csv_path, 'w', encoding='utf-8') as f:
+            with open_raw(raw_path(csv_path, self.raw_compression), 'wt', self.raw_compression) as f:
                 f.write(raw_content)
 
             # Navigate back to the listing
@@ -711,35 +795,16 @@ class CovidTracker:
             Processed DataFrame
         """
         try:
-            # Parse CSV content
-            df = pd.read_csv(pd.StringIO(raw_content))
-            
-            # Handle missing values
-            for col in df.columns:
-                if df[col].isnull().any():
-                    if pd.api.types.is_numeric_dtype(df[col]):
-                        df[col] = df[col].fillna(0)
-                    else:
-                        df[col] = df[col].fillna('')
-                        
-            # Handle column name variations
-            column_name_fixes = {
-                'Case-Fatality_Ratio': 'Case_Fatality_Ratio',
-                'Incident_Rate': 'Incidence_Rate',
-                'Last Update': 'Last_Update'
-            }
-            
-            df = df.rename(columns=column_name_fixes)
+            # Parse, keeping the columns of the rename plan for the parsed header
+            df, plan = read_daily_csv(raw_content, self.parse_engine, self.schema_registry.plan_for)
+
+            # Apply the declared dtypes, fill missing values and fix column names in one pass
+            df = normalize_daily_frame(df, plan)
             
-            # Convert date columns
-            date_columns = ['Last_Update']
-            for col in date_columns:
-                if col in df.columns:
-                    try:
-                        df[col] = pd.to_datetime(df[col])
-                    except:
-                        logger.warning(f"Failed to convert {col} to datetime")
-                        
+            # Convert date columns with the format detected for this file
+            if 'Last_Update' in df.columns:
+                df['Last_Update'], _ = self.timestamp_formats.parse(df['Last_Update'], self.metrics)
+
             # Add the date as a column for reference
             df['Report_Date'] = pd.to_datetime(date_str, format='%m-%d-%Y')
             
@@ -763,35 +828,82 @@ class CovidTracker:
                 logger.error("Failed to navigate to daily reports, aborting")
                 return
                 
-            all_dfs = []  # This was incorrectly written as "dfs = []" in your snippet
+            # Each day is copied into the combined columns as it arrives, so the daily frames can be dropped
+            combined = FrameAccumulator(expected_frames=len(date_range))
+            digests = {}
+            reused = 0
             
             for date_str in date_range:
                 try:
-                    raw_content = self.scrape_date(date_str)
+                    # Days saved by an earlier scrape are read back instead of scraped again
+                    raw_content = self._read_cached(date_str)
+                    scraped = raw_content is None
+                    if scraped:
+                        raw_content = self.scrape_date(date_str)
                     if raw_content:
+                        digest = content_hash(raw_content)
+                        if self._already_stored(date_str, digest):
+                            reused += 1
+                            continue
+
                         df = self.process_csv_data(raw_content, date_str)
                         if not df.empty:
-                            all_dfs.append(df)
-                            
-                        # Small delay to avoid overwhelming the server
-                        time.sleep(1)
+                            digests[date_str] = f"v{PROCESSING_VERSION}_{digest}"
+                            if self.store is not None:
+                                self.store.write_day(date_str, df, digest)
+                            if self.mongo_sink is not None:
+                                self.mongo_sink.write_day(date_str, df, digest)
+                            if self.category_dictionary:
+                                # The dictionary only grows, so earlier days' codes stay valid under the newer dtype
+                                self.category_dictionary.update([df])
+                                self.category_dictionary.encode(df)
+                            combined.append(df)
+
+                        if scraped:
+                            # Small delay to avoid overwhelming the server
+                            time.sleep(1)
                 except Exception as e:
                     logger.error(f"Error processing date {date_str}: {e}")
                     continue
                     
-            # Combine all DataFrames
-            if all_dfs:
-                self.data = pd.concat(all_dfs, ignore_index=True)
-                # Save combined data
-                combined_path = self.data_dir / f"covid_combined_{self.start_date.strftime('%m_%d_%Y')}_to_{self.end_date.strftime('%m_%d_%Y')}.csv"
-                self.data.to_csv(combined_path, index=False)
-                logger.info(f"Saved combined data to {combined_path}")
+            # New days are appended to the combined store, and the range is always sliced from it
+            if combined.frames:
+                self.combined_store.append(combined.to_frame(), digests)
+            self.data = self.combined_store.read(self.start_date.strftime('%m-%d-%Y'), self.end_date.strftime('%m-%d-%Y'))
+            if self.memory_report is not None:
+                # Only the loaded data is downcast; the combined store keeps full precision
+                self.data, savings = downcast_frame(self.data)
+                self.memory_report.add(savings)
+            if not self.data.empty:
+                if self.category_dictionary:
+                    self.category_dictionary.update([self.data])
+                    self.category_dictionary.encode(self.data)
+                logger.info(f"Loaded {len(self.data)} rows ({reused} days reused) from {self.combined_store.path}")
             else:
                 logger.warning("No data was scraped")
+
+            metrics = self.metrics.summary()
+            if metrics:
+                logger.info(f"Parse metrics: {metrics}")
+            if self.memory_report is not None:
+                self.memory_report.log()
+            if self.mongo_sink is not None:
+                self.mongo_sink.log()
                 
         finally:
             self.close()
 
+    @property
+    def state_index(self) -> StateSeriesIndex:
+        """Per-state index of self.data, rebuilt when self.data is replaced"""
+        if self._state_index is None or self._state_index.source is not self.data:
+            self._state_index = StateSeriesIndex(self.data)
+        return self._state_index
+
+    def _state_rows(self, state: str) -> pd.DataFrame:
+        """Rows of one state sorted by date, sliced from the state index instead of masking self.data"""
+        return self.state_index.rows(state)
+
     def generate_visualizations(self, states: List[str] = None):
         """
         Generate visualizations for the specified states.
@@ -803,21 +915,19 @@ class CovidTracker:
             logger.warning("No data to visualize")
             return
 
-        # Filter to only rows with confirmed cases
-        data = self.data[self.data['Confirmed'] > 0].copy()
-
-        # If no states specified, get all unique states
+        # If no states specified, get all states with confirmed cases
         if not states:
-            try:
-                states = data['Province_State'].unique().tolist()
-            except KeyError:
+            if 'Province_State' not in self.data.columns:
                 logger.error("Province_State column not found in data")
                 return
+            states = [state for state in self.state_index.states
+                      if (self.state_index.column(state, 'Confirmed') > 0).any()]
 
         for state in states:
             try:
-                # Filter data for this state
-                state_data = data[data['Province_State'] == state].copy()
+                # Rows of this state with confirmed cases
+                state_data = self._state_rows(state)
+                state_data = state_data[state_data['Confirmed'] > 0]
 
                 if state_data.empty:
                     logger.warning(f"No data for state: {state}")
@@ -873,7 +983,7 @@ class CovidTracker:
                 logger.error(f"Error generating visualization for {state}: {e}")
 
     def close(self):
-        """Close the WebDriver"""
+        """Close the WebDriver and the time series store"""
         if self.driver:
             try:
                 self.driver.quit()
@@ -882,6 +992,9 @@ class CovidTracker:
                 pass
             finally:
                 self.driver = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
 
     def __del__(self):
         """Destructor to ensure WebDriver is closed"""
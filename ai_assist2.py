@@ -7,17 +7,45 @@ using direct URLs to the raw CSV files in the csse_covid_19_daily_reports_us dir
 """
 
 import os
+import json
 import logging
+import shutil
+import tarfile
+import tempfile
+import threading
 import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
 import re
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 
+from fetch_manifest import MANIFEST_FILE, FetchManifest
+from frame_accumulator import FrameAccumulator
+from frame_cache import CACHE_SUBDIR, FrameCache, content_hash, file_hash
+from frame_memory import MemoryReport, downcast_frame
+from categories import CATEGORY_DICTIONARY_FILE, CategoryDictionary
+from combined_dataset import DEFAULT_COMBINED_FORMAT, CombinedStore
+from csv_schema import DEFAULT_PARSE_ENGINE, PROCESSING_VERSION, resolve_parse_engine
+from daily_parse import parse_daily_report, parse_in_processes
+from derived_metrics import DERIVED_METRICS_FILE, NATIONAL_SERIES, DerivedMetricsTable, daily_totals, derive
+from mongo_sink import MongoSink
+from raw_store import check_compression, find_raw, open_raw, raw_path, read_text, remove_other_variants
+from raw_validation import HeaderValidator, quarantine
+from retry_policy import DEFAULT_RETRY_BUDGETS, CircuitBreaker, FetchMetrics, RetryPolicy
+from schema_registry import SCHEMA_REGISTRY_FILE, SchemaRegistry, read_header
+from state_index import StateSeriesIndex
+from storage import write_json_atomic
+from timeseries_store import TIMESERIES_STORE_FILE, TimeSeriesStore
+from timestamp_formats import TimestampFormatRegistry
+
 
 # Configure logging
 logging.basicConfig(
@@ -33,8 +61,194 @@ logger = logging.getLogger("us_covid_fetcher")
 # Constants
 # Note: We're now using the US-specific directory
 GITHUB_RAW_URL = "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_daily_reports_us/"
+# Point the fetcher at a mirror or the offline replay server (replay_server.py)
+DATA_URL = os.environ.get("COVID_DATA_URL", GITHUB_RAW_URL)
+GITHUB_ARCHIVE_URL = "https://github.com/CSSEGISandData/COVID-19/archive/refs/heads/master.tar.gz"
+# Matches the daily US report files inside a repository archive
+ARCHIVE_MEMBER_PATTERN = re.compile(r'csse_covid_19_daily_reports_us/(\d{2}-\d{2}-\d{4})\.csv$')
 DATA_DIR = Path("us_covid_data")
 GRAPH_DIR = Path("us_covid_graphs")
+DEFAULT_REQUESTS_PER_SECOND = 2.0  # Same pace as the old fixed 0.5s sleep
+HTTP_METADATA_FILE = "http_metadata.json"
+COMBINED_STORE_NAME = "us_covid_combined"
+NEGATIVE_CACHE_TTL = timedelta(hours=24)  # Wait before re-requesting a date that failed once
+NEGATIVE_CACHE_MAX_TTL = timedelta(days=30)
+# Statuses that say the file does not exist; server errors and rate limiting are transient
+MISSING_STATUSES = (404, 410)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how often requests may be sent"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Initialize the token bucket.
+
+        Args:
+            rate: Tokens added per second (i.e. sustained requests per second)
+            capacity: Maximum number of tokens, which bounds the burst size
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and consume it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait_time = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_time)
+
+
+class HostRateLimiter:
+    """Keeps one token bucket per host so every worker shares the same budget"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url: str):
+        """Block until a request to the host of the given URL is allowed"""
+        host = urlparse(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.capacity)
+                self.buckets[host] = bucket
+
+        bucket.acquire()
+
+
+class HttpMetadataStore:
+    """Sidecar JSON store of the ETag / Last-Modified validators seen for each date"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, str]] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (ValueError, OSError) as e:
+                logger.warning(f"Ignoring unreadable HTTP metadata file {self.path}: {e}")
+
+    def conditional_headers(self, date_str: str) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for a previously fetched date"""
+        with self.lock:
+            entry = self.entries.get(date_str, {})
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, date_str: str, response_headers) -> None:
+        """Record the validators from a successful response and persist the store"""
+        entry = {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'fetched_at': datetime.now().isoformat(timespec='seconds')
+        }
+
+        with self.lock:
+            self.entries[date_str] = entry
+            write_json_atomic(self.path, self.entries, indent=2, sort_keys=True)
+
+
+class NegativeCache:
+    """
+    Tracks dates the server reported missing (404/410) using the .404 marker files.
+
+    Each marker records the last HTTP status, the number of failed attempts and
+    when the date may be requested again. The wait doubles with every repeated
+    failure, capped at max_ttl.
+    """
+
+    def __init__(self, data_dir: Path, ttl: timedelta = NEGATIVE_CACHE_TTL,
+                 max_ttl: timedelta = NEGATIVE_CACHE_MAX_TTL):
+        self.data_dir = data_dir
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+
+    def marker_path(self, date_str: str) -> Path:
+        return self.data_dir / f"us_covid_{date_str.replace('-', '_')}.404"
+
+    def read(self, date_str: str) -> Optional[Dict]:
+        """Read the marker for a date, upgrading the old free-text markers on the fly"""
+        path = self.marker_path(date_str)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        try:
+            entry = json.loads(content)
+            entry['next_eligible'] = datetime.fromisoformat(entry['next_eligible'])
+            return entry
+        except (ValueError, KeyError, TypeError):
+            # Legacy marker: "Failed to fetch on <timestamp>, status code: <code>"
+            match = re.search(r'status code: (\d+)', content)
+            last_attempt = datetime.fromtimestamp(path.stat().st_mtime)
+            return {
+                'status': int(match.group(1)) if match else None,
+                'attempts': 1,
+                'last_attempt': last_attempt.isoformat(timespec='seconds'),
+                'next_eligible': last_attempt + self.ttl
+            }
+
+    def next_eligible(self, date_str: str) -> Optional[datetime]:
+        """
+        Return when the date may be retried, or None if it may be requested now.
+
+        Only markers of a definitive miss hold a date back; legacy markers of a
+        server error or rate limiting, or with no status at all, do not.
+        """
+        entry = self.read(date_str)
+        if entry and entry['status'] in MISSING_STATUSES and entry['next_eligible'] > datetime.now():
+            return entry['next_eligible']
+        return None
+
+    def record_failure(self, date_str: str, status: int):
+        """Record another failed attempt and push back the next eligible time"""
+        entry = self.read(date_str)
+        attempts = entry['attempts'] + 1 if entry else 1
+        now = datetime.now()
+        wait = min(self.ttl * (2 ** (attempts - 1)), self.max_ttl)
+
+        write_json_atomic(self.marker_path(date_str), {
+            'status': status,
+            'attempts': attempts,
+            'last_attempt': now.isoformat(timespec='seconds'),
+            'next_eligible': (now + wait).isoformat(timespec='seconds')
+        }, indent=2)
+
+    def clear(self, date_str: str):
+        """Forget a date once it has been fetched successfully"""
+        self.marker_path(date_str).unlink(missing_ok=True)
 
 
 class USCovidFetcher:
@@ -46,7 +260,32 @@ class USCovidFetcher:
         end_date: str = "06-30-2022",    # Default to June 2022
         data_dir: Path = DATA_DIR,
         graph_dir: Path = GRAPH_DIR,
-        request_timeout: int = 10
+        request_timeout: int = 10,
+        base_url: str = DATA_URL,
+        max_workers: int = 1,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        burst: int = 1,
+        pool_size: int = 10,
+        max_retries: Optional[int] = None,
+        refresh: bool = False,
+        use_frame_cache: bool = True,
+        force_recheck: bool = False,
+        stream_to_disk: bool = True,
+        raw_compression: Optional[str] = None,
+        negative_ttl: timedelta = NEGATIVE_CACHE_TTL,
+        retry_budgets: Dict[str, int] = None,
+        breaker_threshold: float = 0.5,
+        breaker_cooldown: float = 30.0,
+        use_manifest: bool = True,
+        parse_engine: str = DEFAULT_PARSE_ENGINE,
+        compact_strings: bool = False,
+        memory_budget_mb: Optional[float] = None,
+        parse_workers: int = 1,
+        combined_format: str = DEFAULT_COMBINED_FORMAT,
+        partition_by_state: bool = False,
+        use_store: bool = True,
+        use_mongo: bool = False,
+        use_derived_metrics: bool = True
     ):
         """
         Initialize the US COVID data fetcher.
@@ -57,14 +296,88 @@ class USCovidFetcher:
             data_dir: Directory to store raw and processed data
             graph_dir: Directory to store generated graphs
             request_timeout: Timeout for HTTP requests in seconds
+            base_url: URL of the directory holding the daily CSV files (COVID_DATA_URL overrides the default)
+            max_workers: Number of dates fetched concurrently (1 keeps the serial path)
+            requests_per_second: Sustained request rate allowed per host
+            burst: Number of requests per host that may be sent back to back
+            pool_size: Number of keep-alive connections kept open per host
+            max_retries: Retry budget applied to every error class (defaults to per-class budgets)
+            refresh: Revalidate already cached dates with conditional requests
+            use_frame_cache: Reuse previously parsed frames for unchanged CSV files
+            force_recheck: Request dates even if they are marked missing and not yet due
+            stream_to_disk: Parse each day straight from its file on disk (memory-mapped)
+                instead of first reading it into a Python string
+            raw_compression: Store newly fetched raw CSVs compressed ('gzip' or 'zstd');
+                existing files in any format are always readable
+            negative_ttl: Initial wait before re-requesting a date the server failed to deliver
+            retry_budgets: Per-error-class retry budgets overriding max_retries
+                ('timeout', 'connection', 'server_error', 'rate_limited')
+            breaker_threshold: Upstream error rate that pauses the whole run
+            breaker_cooldown: How long the run pauses once the breaker trips, in seconds
+            use_manifest: Record every date in a SQLite manifest and only process
+                dates that are missing or stale on later runs
+            parse_engine: CSV parser: 'pyarrow', 'c' (pandas), or 'auto' to use pyarrow when
+                installed (COVID_PARSE_ENGINE overrides the default)
+            compact_strings: Store the label columns of the combined data as categoricals
+                sharing one saved category dictionary
+            memory_budget_mb: Downcast the numeric columns of the loaded data to the
+                narrowest safe type and report the bytes saved and peak RSS against
+                this budget (the combined store and the sinks keep full precision)
+            parse_workers: Number of processes parsing downloaded files (1 parses them
+                in the fetching threads as they arrive)
+            combined_format: How the combined store (us_covid_combined in the data
+                directory, which every run appends its new days to) is kept: 'parquet'
+                (a dataset partitioned by report month, read back with
+                combined_dataset.read_dataset) or 'csv' (COVID_COMBINED_FORMAT overrides
+                the default)
+            partition_by_state: Also partition the Parquet dataset by state
+            use_store: Keep every processed day in an indexed SQLite time series store
+            use_mongo: Also write every processed day to MongoDB, configured by the
+                COVID_MONGO_* environment variables
+            use_derived_metrics: Maintain the per-state and national new case/death series
+                and their 7-day averages in a SQLite table, updated only where a day
+                changed, which the plots read instead of recomputing them
         """
         self.request_timeout = request_timeout
+        self.base_url = base_url if base_url.endswith('/') else f"{base_url}/"
+        self.max_workers = max(1, max_workers)
+        self.parse_workers = max(1, parse_workers)
+        self.rate_limiter = HostRateLimiter(requests_per_second, burst)
+        self.refresh = refresh
+        self.session = self._create_session(max(pool_size, self.max_workers))
+        self.metrics = FetchMetrics()
+        budgets = {name: max_retries for name in DEFAULT_RETRY_BUDGETS} if max_retries is not None else {}
+        budgets.update(retry_budgets or {})
+        self.retry_policy = RetryPolicy(budgets=budgets)
+        self.circuit_breaker = CircuitBreaker(
+            threshold=breaker_threshold,
+            cooldown=breaker_cooldown,
+            metrics=self.metrics
+        )
 
         # Setup directories
         self.data_dir = data_dir
         self.graph_dir = graph_dir
         self.data_dir.mkdir(exist_ok=True)
         self.graph_dir.mkdir(exist_ok=True)
+        self.http_metadata = HttpMetadataStore(self.data_dir / HTTP_METADATA_FILE)
+        self.frame_cache = FrameCache(self.data_dir / CACHE_SUBDIR, PROCESSING_VERSION) if use_frame_cache else None
+        self.negative_cache = NegativeCache(self.data_dir, ttl=negative_ttl)
+        self.force_recheck = force_recheck
+        self.stream_to_disk = stream_to_disk
+        check_compression(raw_compression)
+        self.raw_compression = raw_compression
+        self.manifest = FetchManifest(self.data_dir / MANIFEST_FILE) if use_manifest else None
+        self.parse_engine = resolve_parse_engine(parse_engine)
+        self.timestamp_formats = TimestampFormatRegistry()
+        self.schema_registry = SchemaRegistry(self.data_dir / SCHEMA_REGISTRY_FILE)
+        self.header_validator = HeaderValidator(self.schema_registry)
+        self.category_dictionary = CategoryDictionary(self.data_dir / CATEGORY_DICTIONARY_FILE) if compact_strings else None
+        self.memory_report = MemoryReport(memory_budget_mb) if memory_budget_mb else None
+        self.combined_store = CombinedStore(self.data_dir / COMBINED_STORE_NAME, combined_format, partition_by_state)
+        self.store = TimeSeriesStore(self.data_dir / TIMESERIES_STORE_FILE, PROCESSING_VERSION) if use_store else None
+        self.mongo_sink = MongoSink.from_env(version=PROCESSING_VERSION) if use_mongo else None
+        self.derived_metrics = DerivedMetricsTable(self.data_dir / DERIVED_METRICS_FILE) if use_derived_metrics else None
 
         # Setup dates
         self.today = date.today()
@@ -77,6 +390,27 @@ class USCovidFetcher:
 
         # Initialize data storage
         self.data = pd.DataFrame()
+        self._state_index: Optional[StateSeriesIndex] = None
+
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """Create a keep-alive session with a connection pool shared by all workers"""
+        # Retries are handled by self.retry_policy so they can be budgeted and counted
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def close(self):
+        """Close the HTTP session, the manifest, the time series store and the metrics table"""
+        self.session.close()
+        if self.manifest is not None:
+            self.manifest.close()
+        if self.store is not None:
+            self.store.close()
+        if self.derived_metrics is not None:
+            self.derived_metrics.close()
 
     def _parse_date(self, date_str: str) -> date:
         """Parse date string in format MM-DD-YYYY"""
@@ -90,102 +424,205 @@ class USCovidFetcher:
         date_range = pd.date_range(start=self.start_date, end=self.end_date, freq='D')
         return [d.strftime('%m-%d-%Y') for d in date_range]
 
-    def fetch_csv(self, date_str: str) -> Optional[str]:
+    def _get_with_retries(self, url: str, date_str: str, headers: Dict[str, str],
+                          stream: bool = False) -> requests.Response:
         """
-        Fetch CSV data for a specific date directly using the raw GitHub URL.
+        GET a URL, retrying transient failures according to the retry policy.
+
+        Args:
+            url: URL to fetch
+            date_str: Date in format MM-DD-YYYY (for logging)
+            headers: Extra request headers
+            stream: Leave the body unread so the caller can stream it
+
+        Returns:
+            The final response, which may still carry an error status once retries run out
+
+        Raises:
+            requests.exceptions.RequestException: If the last attempt raised
+        """
+        attempts: Dict[str, int] = {}
+
+        while True:
+            self.circuit_breaker.before_request()
+            # Wait for our turn so parallel workers don't hammer the server
+            self.rate_limiter.acquire(url)
+
+            self.metrics.increment('requests')
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.request_timeout, stream=stream)
+            except requests.exceptions.RequestException as e:
+                self.metrics.record_latency(time.perf_counter() - started)
+                error_class = self.retry_policy.classify_exception(e)
+                retry_after = None
+                response = None
+                error = e
+            else:
+                self.metrics.record_latency(time.perf_counter() - started)
+                error_class = self.retry_policy.classify_status(response.status_code)
+                retry_after = response.headers.get('Retry-After')
+                error = None
+
+            self.circuit_breaker.record(error_class is None)
+            if error_class is None and error is None:
+                return response
+
+            delay = None
+            if error_class is not None:
+                self.metrics.increment(f"errors_{error_class}")
+                delay = self.retry_policy.next_delay(error_class, attempts.get(error_class, 0), retry_after)
+
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+
+            if response is not None:
+                # Hand the connection back to the pool before retrying
+                response.close()
+            attempts[error_class] = attempts.get(error_class, 0) + 1
+            self.metrics.increment('retries')
+            self.metrics.increment(f"retries_{error_class}")
+            logger.warning(f"Retrying {date_str} after {error_class} (attempt {attempts[error_class]}) in {delay:.1f}s")
+            time.sleep(delay)
+
+    def _csv_path(self, date_str: str) -> Path:
+        """Plain .csv path of a date; the stored file may carry a compression suffix"""
+        return self.data_dir / f"us_covid_{date_str.replace('-', '_')}.csv"
+
+    def _write_raw(self, date_str: str, chunks) -> Path:
+        """Write raw CSV bytes with the configured compression, atomically replacing any older copy"""
+        csv_path = self._csv_path(date_str)
+        target = raw_path(csv_path, self.raw_compression)
+        tmp_path = target.with_name(target.name + '.part')
+
+        try:
+            with open_raw(tmp_path, 'wb', self.raw_compression) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        remove_other_variants(csv_path, keep=target)
+        return target
+
+    def _validate_raw(self, path: Path, date_str: str) -> bool:
+        """
+        Check a raw file by its header before it is parsed, quarantining it if it is not a daily report.
+
+        Returns:
+            True if the file can be parsed
+        """
+        reason = self.header_validator.check(path)
+        if reason is None:
+            return True
+
+        logger.warning(f"Raw file for {date_str} is not a daily report ({reason}), quarantining it for refetch")
+        quarantine(path)
+        self.metrics.increment('quarantined_files')
+        return False
+
+    def fetch_csv_path(self, date_str: str) -> Optional[Path]:
+        """
+        Make sure the CSV for a specific date is on disk and return its path.
+
+        Downloads are streamed in chunks to a temporary file that is renamed into
+        place once complete, so the body never has to be held in memory and a
+        crash never leaves a truncated CSV behind.
 
         Args:
             date_str: Date in format MM-DD-YYYY
 
         Returns:
-            Raw CSV content as string, or None if fetching failed
+            Path of the CSV file (possibly compressed), or None if fetching failed
         """
         logger.info(f"Fetching US data for {date_str}")
 
-        # Check if we already have the file
-        csv_path = self.data_dir / f"us_covid_{date_str.replace('-', '_')}.csv"
-        if csv_path.exists():
+        # Check if we already have the file, plain or compressed
+        cached_path = find_raw(self._csv_path(date_str))
+        if cached_path and not self._validate_raw(cached_path, date_str):
+            cached_path = None
+        if cached_path and not self.refresh:
             logger.info(f"Data for {date_str} already exists, reading from file")
-            with open(csv_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return cached_path
+
+        # Skip dates the server recently failed to deliver
+        if not self.force_recheck:
+            next_eligible = self.negative_cache.next_eligible(date_str)
+            if next_eligible:
+                logger.info(f"Skipping {date_str}: marked missing until {next_eligible.strftime('%Y-%m-%d %H:%M')}")
+                return None
+
+        # When refreshing a cached day, ask the server whether it changed
+        headers = self.http_metadata.conditional_headers(date_str) if cached_path else {}
 
         # Build the direct URL to the raw CSV file
-        url = f"{GITHUB_RAW_URL}{date_str}.csv"
+        url = f"{self.base_url}{date_str}.csv"
         logger.info(f"Fetching from URL: {url}")
 
         try:
-            # Use requests library to get the content directly
-            response = requests.get(url, timeout=self.request_timeout)
-
-            if response.status_code == 200:
-                # Save the content to file
-                with open(csv_path, 'w', encoding='utf-8') as f:
-                    f.write(response.text)
-
-                logger.info(f"Successfully fetched data for {date_str}")
-                return response.text
-            else:
-                logger.warning(f"Failed to fetch data for {date_str}: HTTP status {response.status_code}")
-                # Save a marker file to indicate we tried but failed
-                with open(csv_path.with_suffix('.404'), 'w') as f:
-                    f.write(f"Failed to fetch on {datetime.now()}, status code: {response.status_code}")
-                return None
+            # Use the pooled session so connections are reused across dates
+            with self._get_with_retries(url, date_str, headers, stream=True) as response:
+                if response.status_code == 304:
+                    logger.info(f"Data for {date_str} not modified, reading from file")
+                    return cached_path
+
+                if response.status_code != 200:
+                    logger.warning(f"Failed to fetch data for {date_str}: HTTP status {response.status_code}")
+                    if response.status_code in MISSING_STATUSES:
+                        # Save a marker file so the date is skipped until its backoff expires;
+                        # a day that failed with a 5xx or 429 is tried again on the next run
+                        self.negative_cache.record_failure(date_str, response.status_code)
+                    return None
+
+                csv_path = self._write_raw(date_str, response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+                if not self._validate_raw(csv_path, date_str):
+                    return None
+
+                self.http_metadata.update(date_str, response.headers)
+                self.negative_cache.clear(date_str)
+
+            logger.info(f"Successfully fetched data for {date_str}")
+            return csv_path
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching data for {date_str}: {e}")
+            self.metrics.increment('failed_requests')
             return None
 
-    def process_csv_data(self, raw_content: str, date_str: str) -> pd.DataFrame:
+    def fetch_csv(self, date_str: str) -> Optional[str]:
         """
-        Process raw CSV content into a DataFrame.
+        Fetch CSV data for a specific date directly using the raw GitHub URL.
 
         Args:
-            raw_content: Raw CSV content as string
             date_str: Date in format MM-DD-YYYY
 
         Returns:
-            Processed DataFrame
+            Raw CSV content as string, or None if fetching failed
         """
-        try:
-            # Parse CSV content
-            df = pd.read_csv(pd.StringIO(raw_content))
-
-            # Check that this is valid data with expected columns
-            required_cols = ['Province_State', 'Confirmed', 'Deaths']
-            if not all(col in df.columns for col in required_cols):
-                logger.warning(f"CSV for {date_str} missing required columns. Found: {df.columns.tolist()}")
-                return pd.DataFrame()
-
-            # Handle missing values
-            for col in df.columns:
-                if df[col].isnull().any():
-                    if pd.api.types.is_numeric_dtype(df[col]):
-                        df[col] = df[col].fillna(0)
-                    else:
-                        df[col] = df[col].fillna('')
-
-            # Handle column name variations
-            column_name_fixes = {
-                'Case-Fatality_Ratio': 'Case_Fatality_Ratio',
-                'Incident_Rate': 'Incidence_Rate',
-                'Last Update': 'Last_Update'
-            }
+        csv_path = self.fetch_csv_path(date_str)
+        if csv_path is None:
+            return None
 
-            df = df.rename(columns=column_name_fixes)
+        return read_text(csv_path)
 
-            # Convert date columns
-            date_columns = ['Last_Update']
-            for col in date_columns:
-                if col in df.columns:
-                    try:
-                        df[col] = pd.to_datetime(df[col])
-                    except:
-                        logger.warning(f"Failed to convert {col} to datetime")
+    def process_csv_data(self, raw_content: Union[str, Path], date_str: str) -> pd.DataFrame:
+        """
+        Process raw CSV content into a DataFrame.
 
-            # Add the date as a column for reference
-            df['Report_Date'] = pd.to_datetime(date_str, format='%m-%d-%Y')
+        Args:
+            raw_content: Raw CSV content as string, or the path of the CSV file
+            date_str: Date in format MM-DD-YYYY
 
-            return df
+        Returns:
+            Processed DataFrame
+        """
+        try:
+            # The rename plan is looked up from the header the parser returns
+            return parse_daily_report(raw_content, date_str, self.parse_engine, self.schema_registry.plan_for,
+                                      self.timestamp_formats, self.metrics)
 
         except Exception as e:
             logger.error(f"Error processing CSV data for {date_str}: {e}")
@@ -193,58 +630,522 @@ class USCovidFetcher:
             logger.error(traceback.format_exc())
             return pd.DataFrame()
 
-    def fetch_all_dates(self):
-        """Fetch data for all dates in the range"""
-        date_range = self._get_date_range()
-        if not date_range:
-            logger.warning("No dates to fetch")
-            return
+    def _process_raw(self, raw_content: Union[str, Path], date_str: str) -> Optional[pd.DataFrame]:
+        """
+        Turn raw CSV content into a processed frame, going through the parsed-frame cache.
 
-        logger.info(f"Preparing to fetch {len(date_range)} dates from {date_range[0]} to {date_range[-1]}")
+        Args:
+            raw_content: Raw CSV content as string, or the path of the CSV file
+            date_str: Date in format MM-DD-YYYY
 
-        all_dfs = []
-        failed_dates = []
+        Returns:
+            Processed DataFrame, or None if processing failed
+        """
+        digest, byte_size = self._raw_identity(raw_content)
+        started = time.perf_counter()
+
+        # Unchanged files come straight from the parsed-frame cache
+        df = self._load_cached(date_str, digest)
+        if df is not None:
+            return self._record_processed(date_str, digest, byte_size, df, time.perf_counter() - started, cached=True)
+
+        df = self.process_csv_data(raw_content, date_str)
+        return self._record_processed(date_str, digest, byte_size, df, time.perf_counter() - started)
+
+    def _raw_identity(self, raw_content: Union[str, Path]) -> Tuple[str, int]:
+        """Content hash and size in bytes of raw CSV content or of a raw file"""
+        if isinstance(raw_content, Path):
+            return file_hash(raw_content), raw_content.stat().st_size
+        return content_hash(raw_content), len(raw_content.encode('utf-8'))
+
+    def _load_cached(self, date_str: str, digest: str) -> Optional[pd.DataFrame]:
+        """Return the cached frame for this content, if there is one"""
+        if self.frame_cache is None:
+            return None
+        df = self.frame_cache.load(date_str, self.frame_cache.key_for_hash(digest))
+        if df is not None:
+            logger.info(f"Loaded parsed frame for {date_str} from cache")
+        return df
 
-        for date_str in date_range:
-            try:
-                # Add a small delay between requests to be nice to the server
-                if date_str != date_range[0]:
-                    time.sleep(0.5)
+    def _record_processed(self, date_str: str, digest: str, byte_size: int, df: pd.DataFrame,
+                          parse_seconds: float, cached: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Cache a freshly processed frame and record the date in the manifest.
+
+        Returns:
+            The frame ready to be combined, or None if processing produced no rows
+        """
+        if not cached:
+            if df.empty:
+                if self.manifest is not None:
+                    self.manifest.record_failure(date_str, "processing produced no rows")
+                return None
+
+            if self.frame_cache is not None:
+                self.frame_cache.store(date_str, self.frame_cache.key_for_hash(digest), df)
+            logger.info(f"Successfully processed data for {date_str}")
+
+        self._persist_day(date_str, df, digest)
+
+        if self.manifest is not None:
+            self.manifest.record_success(
+                date_str,
+                byte_size=byte_size,
+                content_hash=digest,
+                processing_version=PROCESSING_VERSION,
+                parse_seconds=parse_seconds,
+                row_count=len(df)
+            )
+        return df
+
+    def _persist_day(self, date_str: str, df: pd.DataFrame, digest: str):
+        """Write a processed day to the time series store, MongoDB and the metrics table; all skip content they already hold"""
+        if self.store is not None:
+            self.store.write_day(date_str, df, digest)
+        if self.mongo_sink is not None:
+            self.mongo_sink.write_day(date_str, df, digest)
+        if self.derived_metrics is not None:
+            self.derived_metrics.add_day(df)
+
+    def _apply_memory_budget(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Downcast the loaded data when running with a memory budget; stored days keep full precision"""
+        if self.memory_report is None:
+            return df
+        df, savings = downcast_frame(df)
+        self.memory_report.add(savings)
+        return df
+
+    def _fetch_raw(self, date_str: str) -> Optional[Union[str, Path]]:
+        """
+        Fetch a single date without processing it.
 
+        Returns:
+            Path of the raw file (or its content when not streaming to disk), or None if it could not be fetched
+        """
+        try:
+            if self.stream_to_disk:
+                raw_content = self.fetch_csv_path(date_str)
+            else:
                 raw_content = self.fetch_csv(date_str)
-                if raw_content:
-                    df = self.process_csv_data(raw_content, date_str)
-                    if not df.empty:
-                        all_dfs.append(df)
-                        logger.info(f"Successfully processed data for {date_str}")
-                    else:
-                        failed_dates.append(date_str)
-                else:
-                    failed_dates.append(date_str)
+        except Exception as e:
+            logger.error(f"Error fetching date {date_str}: {e}")
+            raw_content = None
+
+        if not raw_content and self.manifest is not None:
+            self.manifest.record_failure(date_str, "fetch failed")
+        return raw_content or None
+
+    def _fetch_and_process(self, date_str: str) -> Optional[pd.DataFrame]:
+        """
+        Fetch and process a single date.
+
+        Args:
+            date_str: Date in format MM-DD-YYYY
+
+        Returns:
+            Processed DataFrame, or None if the date could not be fetched or processed
+        """
+        raw_content = self._fetch_raw(date_str)
+        if raw_content is None:
+            return None
+
+        try:
+            return self._process_raw(raw_content, date_str)
+
+        except Exception as e:
+            logger.error(f"Error processing date {date_str}: {e}")
+            if self.manifest is not None:
+                self.manifest.record_failure(date_str, str(e))
+            return None
+
+    def _fetch_then_parse(self, pending: List[str]) -> Iterator[Optional[pd.DataFrame]]:
+        """
+        Fetch every pending date, then parse the ones not in the frame cache on a process pool.
+
+        Parsing is CPU-bound, so threads only get one core between them; worker
+        processes parse on all of them. The header plans are resolved here so the
+        schema registry is only ever written by this process.
+
+        Args:
+            pending: Dates in format MM-DD-YYYY
 
+        Yields:
+            Processed frame (or None) for each date, in the same order
+        """
+        if self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                raws = list(executor.map(self._fetch_raw, pending))
+        else:
+            raws = [self._fetch_raw(date_str) for date_str in pending]
+
+        # date -> (digest, byte size, raw content, parsed in a worker)
+        entries: Dict[str, Tuple[str, int, Union[str, Path], bool]] = {}
+        tasks = []
+        for date_str, raw_content in zip(pending, raws):
+            if raw_content is None:
+                continue
+            try:
+                digest, byte_size = self._raw_identity(raw_content)
+                if self.frame_cache is not None and self.frame_cache.contains(date_str, self.frame_cache.key_for_hash(digest)):
+                    entries[date_str] = (digest, byte_size, raw_content, False)
+                    continue
+                plan = self.schema_registry.plan_for(read_header(raw_content))
             except Exception as e:
                 logger.error(f"Error processing date {date_str}: {e}")
-                failed_dates.append(date_str)
+                if self.manifest is not None:
+                    self.manifest.record_failure(date_str, str(e))
+                continue
+            entries[date_str] = (digest, byte_size, raw_content, True)
+            tasks.append((raw_content, date_str, self.parse_engine, plan))
+
+        if tasks:
+            logger.info(f"Parsing {len(tasks)} files with {self.parse_workers} worker processes")
+        parsed = parse_in_processes(tasks, self.parse_workers, self.metrics) if tasks else iter(())
+
+        # Frames are handed over one at a time, cached ones read only when their turn comes
+        for date_str in pending:
+            entry = entries.get(date_str)
+            if entry is None:
+                yield None
                 continue
 
-        # Combine all DataFrames
-        if all_dfs:
-            self.data = pd.concat(all_dfs, ignore_index=True)
-            # Save combined data
-            combined_path = self.data_dir / f"us_covid_combined_{self.start_date.strftime('%m_%d_%Y')}_to_{self.end_date.strftime('%m_%d_%Y')}.csv"
-            self.data.to_csv(combined_path, index=False)
-            logger.info(f"Saved combined data to {combined_path}")
+            digest, byte_size, raw_content, in_worker = entry
+            if not in_worker:
+                df = self._load_cached(date_str, digest)
+                if df is not None:
+                    yield self._record_processed(date_str, digest, byte_size, df, 0.0, cached=True)
+                    continue
+                # The cache entry went away since it was checked; parse it here instead
+                try:
+                    df = self._process_raw(raw_content, date_str)
+                except Exception as e:
+                    logger.error(f"Error processing date {date_str}: {e}")
+                    if self.manifest is not None:
+                        self.manifest.record_failure(date_str, str(e))
+                    df = None
+                yield df
+                continue
+
+            df, error, seconds = next(parsed)
+            if error:
+                logger.error(f"Error processing CSV data for {date_str}: {error}")
+                if self.manifest is not None:
+                    self.manifest.record_failure(date_str, error)
+                yield None
+                continue
+            yield self._record_processed(
+                date_str, digest, byte_size, df if df is not None else pd.DataFrame(), seconds
+            )
+
+    def _iter_pending(self, pending: List[str]) -> Iterator[Optional[pd.DataFrame]]:
+        """
+        Fetch and process the pending dates.
+
+        Yields:
+            Processed frame (or None) for each date, in the same order
+        """
+        # Requests are paced by the rate limiter, so the same code serves both modes.
+        # Executor.map yields results in input order, keeping the combined frame
+        # identical to the serial path.
+        if self.parse_workers > 1 and len(pending) > 1:
+            yield from self._fetch_then_parse(pending)
+        elif self.max_workers > 1 and len(pending) > 1:
+            logger.info(f"Fetching with {self.max_workers} parallel workers")
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                yield from executor.map(self._fetch_and_process, pending)
+        else:
+            for date_str in pending:
+                yield self._fetch_and_process(date_str)
+
+    def _completed_digests(self, date_range: List[str]) -> Dict[str, str]:
+        """
+        Content hashes of the dates the manifest says are already done.
+
+        Only the manifest and the parsed-frame cache directory are touched; the raw
+        CSVs are neither read nor hashed. Dates whose cached frame has gone missing
+        are left out so they get processed again.
+        """
+        if self.manifest is None or self.frame_cache is None or self.refresh:
+            return {}
+
+        return {
+            date_str: digest
+            for date_str, digest in self.manifest.completed(date_range, PROCESSING_VERSION).items()
+            if self.frame_cache.contains(date_str, self.frame_cache.key_for_hash(digest))
+        }
+
+    def _load_completed(self, date_str: str, digest: str) -> Optional[pd.DataFrame]:
+        """Load the cached frame of a date finished by an earlier run"""
+        df = self.frame_cache.load(date_str, self.frame_cache.key_for_hash(digest))
+        if df is None:
+            return None
+        self._persist_day(date_str, df, digest)
+        return df
+
+    def _stored_digests(self, date_range: List[str]) -> Dict[str, str]:
+        """
+        Content hashes of the dates the combined store already holds as processed
+        from the content the manifest has for them; their rows are reused as they are.
+        """
+        if self.manifest is None or self.refresh:
+            return {}
+
+        return {
+            date_str: digest
+            for date_str, digest in self.manifest.completed(date_range, PROCESSING_VERSION).items()
+            if self.combined_store.content_hash(date_str) == digest
+        }
+
+    def _backfill_sinks(self, stored: Dict[str, str]):
+        """
+        Write the days reused from the combined store to any enabled sink that lacks
+        them: one deleted since, or enabled after they were stored.
+
+        Frames come from the frame cache, and otherwise from the combined store.
+
+        Args:
+            stored: Content hash of each reused date (MM-DD-YYYY)
+        """
+        missing = set()
+        if self.store is not None:
+            missing.update(self.store.missing_days(stored))
+        if self.mongo_sink is not None:
+            missing.update(self.mongo_sink.missing_days(stored))
+        if self.derived_metrics is not None:
+            missing.update(self.derived_metrics.missing_days(list(stored)))
+        if not missing:
+            return
+
+        dates = sorted(missing, key=self._parse_date)
+        logger.info(f"Backfilling {len(dates)} stored dates into the time series store, MongoDB and metrics table")
+        uncached = []
+        for date_str in dates:
+            key = self.frame_cache.key_for_hash(stored[date_str]) if self.frame_cache is not None else None
+            df = self.frame_cache.load(date_str, key) if key is not None else None
+            if df is None:
+                uncached.append(date_str)
+            else:
+                self._persist_day(date_str, df, stored[date_str])
+
+        if uncached:
+            df = self.combined_store.read(uncached[0], uncached[-1])
+            for date_str, day in df.groupby(df['Report_Date'].dt.strftime('%m-%d-%Y'), sort=False):
+                if date_str in uncached:
+                    self._persist_day(date_str, day.reset_index(drop=True), stored[date_str])
+
+    def _combine_results(self, date_range: List[str], results: Iterable[Optional[pd.DataFrame]], reused: int = 0):
+        """
+        Append per-date frames (in date order) to the combined store and load the
+        fetch range from it into self.data.
+
+        Each frame is copied into a FrameAccumulator as it arrives and dropped, so
+        the per-day frames and the combined frame of the new days are never all in
+        memory at once.
+
+        Args:
+            date_range: Dates in format MM-DD-YYYY that were processed
+            results: Processed frame for each date, or None where it failed
+            reused: Number of further dates in the range already in the combined store
+        """
+        accumulator = FrameAccumulator(expected_frames=len(date_range))
+        failed_dates = []
+
+        for date_str, df in zip(date_range, results):
+            if df is not None:
+                if self.category_dictionary:
+                    # The dictionary only grows, so earlier days' codes stay valid under the newer dtype
+                    self.category_dictionary.update([df])
+                    self.category_dictionary.encode(df)
+                accumulator.append(df)
+            else:
+                failed_dates.append(date_str)
+
+        if accumulator.frames:
+            digests = self.manifest.completed(date_range, PROCESSING_VERSION) if self.manifest is not None else {}
+            self.combined_store.append(accumulator.to_frame(), digests)
+
+        if accumulator.frames or reused:
+            # The range is a slice of the store, whichever run appended its days
+            self.data = self._apply_memory_budget(
+                self.combined_store.read(self.start_date.strftime('%m-%d-%Y'), self.end_date.strftime('%m-%d-%Y'))
+            )
+            if self.category_dictionary:
+                self.category_dictionary.update([self.data])
+                self.category_dictionary.encode(self.data)
+            logger.info(f"Loaded {len(self.data)} rows from {self.combined_store.path}")
 
             # Log summary of the fetch
-            success_count = len(all_dfs)
+            success_count = accumulator.frames + reused
             failed_count = len(failed_dates)
-            total_count = len(date_range)
+            total_count = len(date_range) + reused
             logger.info(f"Fetch summary: {success_count}/{total_count} successful ({success_count/total_count*100:.1f}%)")
             if failed_dates:
                 logger.warning(f"Failed dates: {', '.join(failed_dates[:10])}{'...' if len(failed_dates) > 10 else ''}")
         else:
             logger.warning("No data was fetched")
 
+        if self.derived_metrics is not None:
+            logger.info(f"Derived metrics: recomputed {self.derived_metrics.refresh()} rows")
+        if self.memory_report is not None:
+            self.memory_report.log()
+        if self.mongo_sink is not None:
+            self.mongo_sink.log()
+
+    def fetch_all_dates(self):
+        """Fetch the dates of the range the combined store does not already hold"""
+        date_range = self._get_date_range()
+        if not date_range:
+            logger.warning("No dates to fetch")
+            return
+
+        logger.info(f"Preparing to fetch {len(date_range)} dates from {date_range[0]} to {date_range[-1]}")
+
+        # Dates already appended to the combined store are neither loaded nor processed again
+        stored = self._stored_digests(date_range)
+        to_combine = [date_str for date_str in date_range if date_str not in stored]
+        if stored:
+            logger.info(f"Combined store: {len(stored)} dates already stored, {len(to_combine)} to add")
+            self._backfill_sinks(stored)
+
+        # Dates finished by an earlier (possibly interrupted) run are loaded from the frame cache
+        completed = self._completed_digests(to_combine)
+        pending = [date_str for date_str in to_combine if date_str not in completed]
+        if completed:
+            logger.info(f"Manifest: {len(completed)} dates already complete, {len(pending)} to fetch")
+
+        fetched = self._iter_pending(pending)
+
+        def frames_in_order():
+            for date_str in to_combine:
+                if date_str in completed:
+                    yield self._load_completed(date_str, completed[date_str])
+                else:
+                    yield next(fetched)
+
+        self._combine_results(to_combine, frames_in_order(), reused=len(stored))
+        logger.info(f"Fetch metrics: {self.metrics.summary()}")
+
+    def _iter_archive_members(self, source: str):
+        """
+        Yield (date_str, raw_bytes) for every daily US report inside a repository archive.
+
+        Tarballs are read as a stream, so a URL is consumed in one sequential pass
+        without touching disk. Zip files need random access to their central
+        directory, so a zip URL is first downloaded to a temporary file. In both
+        cases only the matching members are read; nothing else is extracted.
+
+        Args:
+            source: Local path or http(s) URL of a .tar.gz/.tar/.zip archive
+        """
+        is_url = source.startswith(('http://', 'https://'))
+
+        if not source.endswith('.zip'):
+            if is_url:
+                with self.session.get(source, stream=True, timeout=self.request_timeout) as response:
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    with tarfile.open(fileobj=response.raw, mode='r|*') as archive:
+                        yield from self._iter_tar_members(archive)
+            else:
+                with tarfile.open(source, mode='r|*') as archive:
+                    yield from self._iter_tar_members(archive)
+            return
+
+        if is_url:
+            with tempfile.TemporaryFile() as tmp:
+                with self.session.get(source, stream=True, timeout=self.request_timeout) as response:
+                    response.raise_for_status()
+                    shutil.copyfileobj(response.raw, tmp)
+                tmp.seek(0)
+                with zipfile.ZipFile(tmp) as archive:
+                    yield from self._iter_zip_members(archive)
+        else:
+            with zipfile.ZipFile(source) as archive:
+                yield from self._iter_zip_members(archive)
+
+    def _iter_tar_members(self, archive: tarfile.TarFile):
+        for member in archive:
+            match = ARCHIVE_MEMBER_PATTERN.search(member.name)
+            if member.isfile() and match:
+                yield match.group(1), archive.extractfile(member).read()
+
+    def _iter_zip_members(self, archive: zipfile.ZipFile):
+        for name in archive.namelist():
+            match = ARCHIVE_MEMBER_PATTERN.search(name)
+            if match:
+                yield match.group(1), archive.read(name)
+
+    def ingest_archive(self, source: str = GITHUB_ARCHIVE_URL):
+        """
+        Load the date range from one repository archive instead of one request per day.
+
+        Daily CSVs in the range are written to the data directory (existing files
+        are kept) and processed as they are read, then combined exactly as
+        fetch_all_dates would.
+
+        Args:
+            source: Local path or URL of a zip/tar archive of the COVID-19 repository
+        """
+        date_range = self._get_date_range()
+        if not date_range:
+            logger.warning("No dates to ingest")
+            return
+
+        wanted = set(date_range)
+        frames: Dict[str, pd.DataFrame] = {}
+        logger.info(f"Ingesting {len(date_range)} dates from archive {source}")
+
+        try:
+            for date_str, raw_bytes in self._iter_archive_members(str(source)):
+                if date_str not in wanted:
+                    continue
+
+                reason = self.header_validator.check(raw_bytes)
+                if reason is not None:
+                    logger.warning(f"Skipping archive member for {date_str}: not a daily report ({reason})")
+                    continue
+
+                raw_content = raw_bytes.decode('utf-8')
+                existing = find_raw(self._csv_path(date_str))
+                if not existing or not self._validate_raw(existing, date_str):
+                    self._write_raw(date_str, [raw_bytes])
+                self.negative_cache.clear(date_str)
+
+                df = self._process_raw(raw_content, date_str)
+                if df is not None:
+                    frames[date_str] = df
+
+        except (requests.exceptions.RequestException, tarfile.TarError, zipfile.BadZipFile, OSError) as e:
+            logger.error(f"Error reading archive {source}: {e}")
+
+        # Archive members are not stored in date order; each frame is released once combined
+        self._combine_results(date_range, (frames.pop(date_str, None) for date_str in date_range))
+
+    @property
+    def state_index(self) -> StateSeriesIndex:
+        """Per-state index of self.data, rebuilt when self.data is replaced"""
+        if self._state_index is None or self._state_index.source is not self.data:
+            self._state_index = StateSeriesIndex(self.data)
+        return self._state_index
+
+    def _state_rows(self, state: str) -> pd.DataFrame:
+        """Rows of one state sorted by date, sliced from the state index instead of masking self.data"""
+        return self.state_index.rows(state)
+
+    def _metric_series(self, name: str) -> pd.DataFrame:
+        """
+        Daily totals, new cases/deaths and 7-day averages of one state (or of the
+        nation, for NATIONAL_SERIES) over the fetch range, read from the metrics
+        table or derived from self.data when the table is off.
+        """
+        if self.derived_metrics is not None:
+            return self.derived_metrics.series(name, self.start_date, self.end_date)
+
+        rows = self.data if name == NATIONAL_SERIES else self._state_rows(name)
+        totals = daily_totals(rows)
+        totals = totals[totals['series'] == name].drop(columns='series').dropna(axis=1, how='all')
+        return derive(totals.sort_values('Report_Date').reset_index(drop=True))
+
     def generate_visualizations(self, states: List[str] = None):
         """
         Generate visualizations for the specified states.
@@ -256,49 +1157,24 @@ class USCovidFetcher:
             logger.warning("No data to visualize")
             return
 
-        # Filter to only rows with confirmed cases
-        data = self.data[self.data['Confirmed'] > 0].copy()
-
-        # If no states specified, get all unique states
+        # If no states specified, get all states with confirmed cases
         if not states:
-            try:
-                states = data['Province_State'].unique().tolist()
-            except KeyError:
+            if 'Province_State' not in self.data.columns:
                 logger.error("Province_State column not found in data")
                 return
+            states = [state for state in self.state_index.states
+                      if (self.state_index.column(state, 'Confirmed') > 0).any()]
 
         for state in states:
             try:
-                # Filter data for this state
-                state_data = data[data['Province_State'] == state].copy()
+                # Daily totals of the days with confirmed cases, with new cases/deaths and
+                # their 7-day moving averages already computed
+                state_time_series = self._metric_series(state)
 
-                if state_data.empty:
+                if state_time_series.empty:
                     logger.warning(f"No data for state: {state}")
                     continue
 
-                # Group by report date for time series analysis
-                state_time_series = state_data.groupby('Report_Date').agg({
-                    'Confirmed': 'max',  # Use max since we want the cumulative count
-                    'Deaths': 'max',
-                    'Incident_Rate': 'max' if 'Incident_Rate' in state_data.columns else lambda x: np.nan,
-                    'Case_Fatality_Ratio': 'max' if 'Case_Fatality_Ratio' in state_data.columns else lambda x: np.nan
-                }).reset_index()
-
-                # Sort by date
-                state_time_series = state_time_series.sort_values('Report_Date')
-
-                # Calculate daily new cases and deaths
-                state_time_series['New_Cases'] = state_time_series['Confirmed'].diff().fillna(0)
-                state_time_series['New_Deaths'] = state_time_series['Deaths'].diff().fillna(0)
-
-                # Replace negative values with 0 (data corrections)
-                state_time_series['New_Cases'] = state_time_series['New_Cases'].clip(lower=0)
-                state_time_series['New_Deaths'] = state_time_series['New_Deaths'].clip(lower=0)
-
-                # Calculate 7-day moving averages
-                state_time_series['New_Cases_7day_Avg'] = state_time_series['New_Cases'].rolling(7).mean()
-                state_time_series['New_Deaths_7day_Avg'] = state_time_series['New_Deaths'].rolling(7).mean()
-
                 # Create a multi-panel figure
                 fig, axes = plt.subplots(2, 2, figsize=(20, 16))
 
@@ -400,21 +1276,21 @@ class USCovidFetcher:
 
             # 1. Compare confirmed cases per 100k population
             for state in all_comparison_states:
-                state_data = self.data[self.data['Province_State'] == state].copy()
+                state_data = self._state_rows(state)
                 if state_data.empty:
                     continue
 
-                # Group by date
-                grouped = state_data.groupby('Report_Date').agg({
-                    'Incident_Rate': 'max' if 'Incident_Rate' in state_data.columns else lambda x: np.nan
-                }).reset_index()
+                if 'Incidence_Rate' not in state_data.columns:
+                    continue
+
+                # Group by date; the rows are already in date order
+                grouped = state_data.groupby('Report_Date', sort=False)['Incidence_Rate'].max().reset_index()
 
                 # Plot incident rate if available
-                if 'Incident_Rate' in grouped.columns and not grouped['Incident_Rate'].isnull().all():
-                    grouped = grouped.sort_values('Report_Date')
+                if not grouped['Incidence_Rate'].isnull().all():
                     linestyle = '-' if state == focal_state else '--'
                     linewidth = 2.5 if state == focal_state else 1.5
-                    ax1.plot(grouped['Report_Date'], grouped['Incident_Rate'],
+                    ax1.plot(grouped['Report_Date'], grouped['Incidence_Rate'],
                             label=state, linestyle=linestyle, linewidth=linewidth)
 
             ax1.set_title(f"COVID-19 Cases per 100,000 Population: {focal_state} vs. Other States", fontsize=14)
@@ -424,18 +1300,18 @@ class USCovidFetcher:
 
             # 2. Compare case fatality ratios
             for state in all_comparison_states:
-                state_data = self.data[self.data['Province_State'] == state].copy()
+                state_data = self._state_rows(state)
                 if state_data.empty:
                     continue
 
-                # Group by date
-                grouped = state_data.groupby('Report_Date').agg({
-                    'Case_Fatality_Ratio': 'max' if 'Case_Fatality_Ratio' in state_data.columns else lambda x: np.nan
-                }).reset_index()
+                if 'Case_Fatality_Ratio' not in state_data.columns:
+                    continue
+
+                # Group by date; the rows are already in date order
+                grouped = state_data.groupby('Report_Date', sort=False)['Case_Fatality_Ratio'].max().reset_index()
 
                 # Plot case fatality ratio if available
-                if 'Case_Fatality_Ratio' in grouped.columns and not grouped['Case_Fatality_Ratio'].isnull().all():
-                    grouped = grouped.sort_values('Report_Date')
+                if not grouped['Case_Fatality_Ratio'].isnull().all():
                     linestyle = '-' if state == focal_state else '--'
                     linewidth = 2.5 if state == focal_state else 1.5
                     ax2.plot(grouped['Report_Date'], grouped['Case_Fatality_Ratio'],
@@ -470,28 +1346,9 @@ class USCovidFetcher:
             return
 
         try:
-            # Create a national time series by aggregating all states
-            national_data = self.data.groupby('Report_Date').agg({
-                'Confirmed': 'sum',
-                'Deaths': 'sum',
-                'Incident_Rate': 'mean' if 'Incident_Rate' in self.data.columns else lambda x: np.nan,
-                'Case_Fatality_Ratio': 'mean' if 'Case_Fatality_Ratio' in self.data.columns else lambda x: np.nan
-            }).reset_index()
-
-            # Sort by date
-            national_data = national_data.sort_values('Report_Date')
-
-            # Calculate daily new cases and deaths
-            national_data['New_Cases'] = national_data['Confirmed'].diff().fillna(0)
-            national_data['New_Deaths'] = national_data['Deaths'].diff().fillna(0)
-
-            # Replace negative values with 0 (data corrections)
-            national_data['New_Cases'] = national_data['New_Cases'].clip(lower=0)
-            national_data['New_Deaths'] = national_data['New_Deaths'].clip(lower=0)
-
-            # Calculate 7-day moving averages
-            national_data['New_Cases_7day_Avg'] = national_data['New_Cases'].rolling(7).mean()
-            national_data['New_Deaths_7day_Avg'] = national_data['New_Deaths'].rolling(7).mean()
+            # National time series (counts summed over all states, rates averaged)
+            # with new cases/deaths and their 7-day moving averages
+            national_data = self._metric_series(NATIONAL_SERIES)
 
             # Create a summary visualization
             fig, axes = plt.subplots(2, 2, figsize=(20, 16))
@@ -586,7 +1443,7 @@ class USCovidFetcher:
         try:
             # Get the latest data for each state
             latest_date = self.data['Report_Date'].max()
-            latest_data = self.data[self.data['Report_Date'] == latest_date].copy()
+            latest_data = self.state_index.on_date(latest_date)
 
             if latest_data.empty:
                 logger.warning("No latest data available for top states comparison")
@@ -701,7 +1558,8 @@ def main():
         end_date=end_date,
         data_dir=data_dir,
         graph_dir=graph_dir,
-        request_timeout=15  # Increase timeout for slower connections
+        request_timeout=15,  # Increase timeout for slower connections
+        max_workers=4
     )
 
     try:
@@ -730,6 +1588,8 @@ def main():
         logger.error(f"Error in main process: {e}")
         import traceback
         logger.error(traceback.format_exc())
+    finally:
+        fetcher.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Shared Category Dictionary
+--------------------------
+Compact representation for the label columns of the combined dataset.
+Province_State, Country_Region, ISO3, Admin2 and Combined_Key repeat the same
+few thousand strings on every row of every day; stored as categoricals they
+become small integer codes plus one copy of each label.
+
+Every day's frame is encoded with the same project-wide CategoricalDtype, so
+pd.concat keeps the columns categorical without re-deriving the categories.
+The dictionary only ever grows, in first-seen order, and is saved next to the
+data so a label keeps its code from run to run.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+from storage import write_json_atomic
+
+logger = logging.getLogger("us_covid_fetcher.categories")
+
+CATEGORY_COLUMNS = ['Province_State', 'Country_Region', 'ISO3', 'Admin2', 'Combined_Key']
+CATEGORY_DICTIONARY_FILE = "category_dictionary.json"
+
+
+class CategoryDictionary:
+    """Append-only label -> code dictionary for each category column, optionally persisted as JSON"""
+
+    def __init__(self, path: Path = None):
+        """
+        Initialize the dictionary.
+
+        Args:
+            path: JSON file the categories are loaded from and saved to (in memory only if None)
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.categories: Dict[str, List[str]] = {}
+        self.dtypes: Dict[str, pd.CategoricalDtype] = {}
+
+        if path and path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.categories = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable category dictionary {path}: {e}")
+
+    def update(self, frames: List[pd.DataFrame]) -> bool:
+        """
+        Add the labels of the frames that are not in the dictionary yet.
+
+        Returns:
+            True if any label was added
+        """
+        added = False
+        with self.lock:
+            for col in CATEGORY_COLUMNS:
+                known = self.categories.setdefault(col, [])
+                seen = set(known)
+                new_labels = []
+                for df in frames:
+                    if col not in df.columns:
+                        continue
+                    for label in df[col].unique():
+                        if isinstance(label, str) and label not in seen:
+                            new_labels.append(label)
+                            seen.add(label)
+
+                if new_labels:
+                    known.extend(new_labels)
+                    # Appending keeps every existing code valid; only the cached dtype is stale
+                    self.dtypes.pop(col, None)
+                    added = True
+
+            if added:
+                self._save()
+        return added
+
+    def dtype(self, col: str) -> pd.CategoricalDtype:
+        """The shared categorical dtype of a column"""
+        dtype = self.dtypes.get(col)
+        if dtype is None:
+            dtype = pd.CategoricalDtype(self.categories.get(col, []))
+            self.dtypes[col] = dtype
+        return dtype
+
+    def encode(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert the category columns of a frame to the shared dtypes, in place"""
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype(self.dtype(col))
+        return df
+
+    def encode_all(self, frames: List[pd.DataFrame]) -> List[pd.DataFrame]:
+        """Register every label in the frames, then encode them all with the same dtypes"""
+        self.update(frames)
+        return [self.encode(df) for df in frames]
+
+    def _save(self):
+        """Persist the categories; called with the lock held"""
+        if self.path is None:
+            return
+        write_json_atomic(self.path, self.categories, indent=1)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+US COVID-19 Category Benchmark
+------------------------------
+Compares the combined dataset with its label columns stored as plain strings
+(pandas' default), as Python objects, and as shared categoricals: memory per
+column and the time of the grouping done by generate_visualizations and
+generate_national_summary.
+
+Usage:
+    python category_benchmark.py --data-dir us_covid_data
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from ai_assist2 import USCovidFetcher
+from categories import CATEGORY_COLUMNS, CategoryDictionary
+from parse_benchmark import corpus_files
+
+logger = logging.getLogger("us_covid_fetcher.benchmark")
+
+
+def load_frames(data_dir: Path, scratch_dir: Path) -> List[pd.DataFrame]:
+    """Parse every cached daily CSV into its processed frame"""
+    fetcher = USCovidFetcher(data_dir=scratch_dir / "data", graph_dir=scratch_dir / "graphs",
+                             use_frame_cache=False, use_manifest=False)
+    frames = [fetcher.process_csv_data(path, date_str) for path, date_str in corpus_files(data_dir)]
+    return [df for df in frames if not df.empty]
+
+
+def combine(frames: List[pd.DataFrame], representation: str) -> pd.DataFrame:
+    """Concatenate the frames with the label columns in the given representation"""
+    frames = [df.copy() for df in frames]
+    if representation == 'object':
+        for df in frames:
+            for col in CATEGORY_COLUMNS:
+                if col in df.columns:
+                    df[col] = df[col].astype(object)
+    elif representation == 'category':
+        frames = CategoryDictionary().encode_all(frames)
+    return pd.concat(frames, ignore_index=True)
+
+
+def workloads() -> Dict[str, Callable[[pd.DataFrame], object]]:
+    """The grouping each plotting method does, keyed by label"""
+    def per_state_masks(data):
+        # generate_visualizations: one boolean mask per state
+        for state in data['Province_State'].unique():
+            data[data['Province_State'] == state].groupby('Report_Date')['Confirmed'].max()
+
+    return {
+        'state masks': per_state_masks,
+        'groupby state': lambda data: data.groupby('Province_State', observed=True)[['Confirmed', 'Deaths']].max(),
+        'national': lambda data: data.groupby('Report_Date')[['Confirmed', 'Deaths']].sum(),
+    }
+
+
+def time_workload(workload: Callable[[pd.DataFrame], object], data: pd.DataFrame, repeat: int = 3) -> float:
+    """Best of `repeat` runs, in ms"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        workload(data)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark categorical label columns on the combined dataset")
+    parser.add_argument('--data-dir', type=Path, default=Path("us_covid_data"), help="Directory of cached daily CSVs")
+    args = parser.parse_args()
+
+    logging.getLogger("us_covid_fetcher").setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        frames = load_frames(args.data_dir, Path(tmp))
+    if not frames:
+        print(f"No daily CSVs found in {args.data_dir}")
+        return
+
+    representations = ['str', 'object', 'category']
+    combined = {name: combine(frames, name) for name in representations}
+    rows = len(combined['str'])
+    columns = [col for col in CATEGORY_COLUMNS if col in combined['str'].columns]
+
+    print(f"\nCombined frame: {len(frames)} days, {rows} rows")
+    print(f"\n{'column (MB)':>16}" + ''.join(f"{name:>10}" for name in representations))
+    for col in columns:
+        sizes = [combined[name][col].memory_usage(deep=True, index=False) / 1e6 for name in representations]
+        print(f"{col:>16}" + ''.join(f"{size:>10.2f}" for size in sizes))
+    totals = [combined[name].memory_usage(deep=True).sum() / 1e6 for name in representations]
+    print(f"{'whole frame':>16}" + ''.join(f"{total:>10.2f}" for total in totals))
+
+    print(f"\n{'workload (ms)':>16}" + ''.join(f"{name:>10}" for name in representations))
+    for label, workload in workloads().items():
+        timings = [time_workload(workload, combined[name]) for name in representations]
+        print(f"{label:>16}" + ''.join(f"{ms:>10.1f}" for ms in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+"""
+Combined Dataset Storage
+------------------------
+Writes the combined frame as a Parquet dataset partitioned by report month
+(Report_Month=2021-01/...) and optionally by state, instead of one CSV of the
+whole range. Rows are sorted by state and date inside each file so the
+row-group statistics of Province_State and Report_Date are tight.
+
+read_dataset pushes date-range and state filters down to pyarrow: partitions
+outside the months asked for are never opened, and inside the others only
+the row groups whose statistics can match are read. Loading one state for one
+quarter touches three month directories instead of parsing the full history.
+
+CombinedStore keeps one such dataset (or one CSV file) for every run instead
+of a new output per date range. Days are appended as they are fetched: only
+the report months a new day falls in are rewritten (a CSV is appended to in
+place), a sidecar JSON records the content hash of every stored day so
+unchanged days are never reprocessed (a lost or damaged sidecar is rebuilt
+from the stored Report_Date values), and any date range is answered by
+reading its slice of the store.
+
+Parquet needs pyarrow; without it the combined frame is still written as CSV.
+
+Usage:
+    python combined_dataset.py query us_covid_data/us_covid_combined \\
+        --state Texas --start 01-01-2022 --end 03-31-2022
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from csv_schema import COLUMN_DTYPES, COLUMN_RENAMES, PYARROW_AVAILABLE
+from storage import write_json_atomic
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+logger = logging.getLogger("us_covid_fetcher.dataset")
+
+COMBINED_FORMATS = ['parquet', 'csv']
+DEFAULT_COMBINED_FORMAT = os.environ.get("COVID_COMBINED_FORMAT", "parquet" if PYARROW_AVAILABLE else "csv")
+
+MONTH_COLUMN = 'Report_Month'
+STATE_COLUMN = 'Province_State'
+# Small enough that a state filter skips most of a month of global data, large enough to compress well
+ROWS_PER_GROUP = 16384
+# Schema metadata key holding the frame's column order, which partitioning would otherwise change
+COLUMNS_METADATA_KEY = b'covid_columns'
+# Suffix of the sidecar recording the days a combined store holds
+STORED_DAYS_SUFFIX = '.days.json'
+
+
+def check_combined_format(fmt: str):
+    """Raise ValueError for an unknown format, or 'parquet' when pyarrow is not installed"""
+    if fmt not in COMBINED_FORMATS:
+        raise ValueError(f"Unsupported combined format: {fmt}. Use one of {COMBINED_FORMATS}")
+    if fmt == 'parquet' and not PYARROW_AVAILABLE:
+        raise ValueError("The parquet combined format requires the 'pyarrow' package")
+
+
+def _partitioning(partition_by_state: bool):
+    fields = [(MONTH_COLUMN, pa.string())]
+    if partition_by_state:
+        fields.append((STATE_COLUMN, pa.string()))
+    return ds.partitioning(pa.schema(fields), flavor='hive')
+
+
+def write_dataset(df: pd.DataFrame, root: Path, partition_by_state: bool = False):
+    """
+    Write a combined frame as a Parquet dataset.
+
+    Months (or month/state pairs) present in the frame replace the same
+    partitions of an existing dataset; other partitions are kept.
+
+    Args:
+        df: Combined frame with a Report_Date column
+        root: Dataset directory
+        partition_by_state: Also partition each month by Province_State
+    """
+    frame = df.sort_values([STATE_COLUMN, 'Report_Date'], kind='stable') if STATE_COLUMN in df.columns else df
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    for index, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            # Categoricals are an in-memory representation; stored as plain text, months
+            # written with and without them share one schema
+            table = table.set_column(index, field.name, table.column(index).cast(field.type.value_type))
+    table = table.append_column(MONTH_COLUMN, pa.array(frame['Report_Date'].dt.strftime('%Y-%m'), pa.string()))
+    if partition_by_state:
+        # Partition values are plain strings, whatever the column is stored as
+        index = table.schema.get_field_index(STATE_COLUMN)
+        table = table.set_column(index, STATE_COLUMN, table.column(STATE_COLUMN).cast(pa.string()))
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[COLUMNS_METADATA_KEY] = json.dumps(list(df.columns)).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    ds.write_dataset(
+        table,
+        root,
+        format='parquet',
+        partitioning=_partitioning(partition_by_state),
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet',
+        max_rows_per_group=ROWS_PER_GROUP,
+        min_rows_per_group=min(ROWS_PER_GROUP, len(table)),
+        file_options=ds.ParquetFileFormat().make_write_options(compression='zstd')
+    )
+
+
+def read_dataset(root: Path, start_date: str = None, end_date: str = None,
+                 states: List[str] = None, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Load part of a combined Parquet dataset.
+
+    Args:
+        root: Dataset directory written by write_dataset
+        start_date: First report date to load, MM-DD-YYYY (unbounded if None)
+        end_date: Last report date to load, MM-DD-YYYY (unbounded if None)
+        states: Province_State values to load (all if None)
+        columns: Columns to load (all if None)
+
+    Returns:
+        Matching rows ordered by Report_Date, then Province_State
+    """
+    dataset = ds.dataset(root, format='parquet', partitioning='hive')
+    schemas = {fragment.physical_schema for fragment in dataset.get_fragments()}
+    if len(schemas) > 1:
+        # Months appended by different runs may differ in a column's type or presence
+        schema = pa.unify_schemas([dataset.schema] + list(schemas), promote_options='permissive')
+        dataset = ds.dataset(root, schema=schema, format='parquet', partitioning='hive')
+
+    # Month bounds prune whole partitions; the date bounds then prune row groups inside them
+    conditions = []
+    if start_date:
+        start = pd.to_datetime(start_date, format='%m-%d-%Y')
+        conditions += [ds.field(MONTH_COLUMN) >= start.strftime('%Y-%m'), ds.field('Report_Date') >= start.to_pydatetime()]
+    if end_date:
+        end = pd.to_datetime(end_date, format='%m-%d-%Y')
+        conditions += [ds.field(MONTH_COLUMN) <= end.strftime('%Y-%m'), ds.field('Report_Date') <= end.to_pydatetime()]
+    if states:
+        conditions.append(ds.field(STATE_COLUMN).isin(list(states)))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    # The stored order comes from one fragment; columns only other months have go after it
+    stored = json.loads((dataset.schema.metadata or {}).get(COLUMNS_METADATA_KEY, b'[]'))
+    stored += [col for col in dataset.schema.names if col not in stored]
+    order = [col for col in (columns or stored) if col != MONTH_COLUMN]
+    table = dataset.to_table(columns=order, filter=expression)
+
+    df = table.to_pandas()
+    if 'Report_Date' in df.columns:
+        keys = ['Report_Date'] + ([STATE_COLUMN] if STATE_COLUMN in df.columns else [])
+        df = df.sort_values(keys, kind='stable', ignore_index=True)
+    return df
+
+
+def _report_month(date_str: str) -> str:
+    """YYYY-MM of a MM-DD-YYYY date"""
+    return f"{date_str[6:]}-{date_str[:2]}"
+
+
+def _date_key(date_str: str) -> str:
+    """Sort key of a MM-DD-YYYY date"""
+    return f"{date_str[6:]}-{date_str[:5]}"
+
+
+def _read_csv(path: Path) -> pd.DataFrame:
+    """Read a combined CSV back with its label columns as text and its dates parsed"""
+    header = pd.read_csv(path, nrows=0).columns
+    text = {COLUMN_RENAMES.get(col, col) for col, dtype in COLUMN_DTYPES.items() if dtype == 'str'}
+    dates = [col for col in ('Report_Date', 'Last_Update') if col in header]
+    # Label gaps were filled with '' and must stay '', while numeric gaps are still gaps
+    return pd.read_csv(
+        path,
+        dtype={col: 'str' for col in header if col in text and col not in dates},
+        keep_default_na=False,
+        na_values={col: [''] for col in header if col not in text},
+        parse_dates=dates
+    )
+
+
+class CombinedStore:
+    """
+    One combined dataset that new days are appended to and date ranges are sliced from.
+
+    Days are identified by their MM-DD-YYYY report date. Appending a day that is
+    already stored replaces its rows.
+    """
+
+    def __init__(self, base_path: Path, fmt: str = DEFAULT_COMBINED_FORMAT, partition_by_state: bool = False):
+        """
+        Open (or start) a combined store.
+
+        Args:
+            base_path: Output path without suffix; the dataset directory for 'parquet'
+            fmt: 'parquet' or 'csv'
+            partition_by_state: Also partition the Parquet dataset by Province_State
+        """
+        check_combined_format(fmt)
+        self.fmt = fmt
+        self.partition_by_state = partition_by_state
+        self.path = base_path if fmt == 'parquet' else base_path.with_name(base_path.name + '.csv')
+        self.days_path = self.path.with_name(self.path.name + STORED_DAYS_SUFFIX)
+        self.lock = threading.Lock()
+        self.days: Dict[str, Dict] = {}
+
+        if not self.path.exists():
+            return
+        try:
+            with open(self.days_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            stored_by_state, days = stored.get('partition_by_state', False), stored['days']
+        except (ValueError, KeyError, OSError, AttributeError) as e:
+            # The rows are intact; only the record of which days they hold is lost
+            logger.warning(f"Unreadable stored days file {self.days_path} ({e}), rebuilding it from {self.path}")
+            stored_by_state, days = self._stored_layout(), None
+
+        if stored_by_state != partition_by_state:
+            # The two layouts cannot share a dataset, so it is rebuilt from scratch
+            logger.warning(f"{self.path} was written with another partitioning, rebuilding it")
+            self._remove()
+        elif days is not None:
+            self.days = days
+        else:
+            try:
+                self.days = self._scan_days()
+            except (ValueError, KeyError, OSError) as e:
+                logger.warning(f"Could not read the days stored in {self.path} ({e}), rebuilding it")
+                self._remove()
+                return
+            self._save_days()
+            logger.info(f"Found {len(self.days)} stored days in {self.path}")
+
+    def _stored_layout(self) -> bool:
+        """Whether the dataset on disk is partitioned by state"""
+        if self.fmt == 'csv':
+            # A CSV file has no partitions, so either setting can keep using it
+            return self.partition_by_state
+        return any(self.path.glob(f"{MONTH_COLUMN}=*/{STATE_COLUMN}=*"))
+
+    def _scan_days(self) -> Dict[str, Dict]:
+        """Row count of every day in the store, from its Report_Date values"""
+        if self.fmt == 'parquet':
+            dates = read_dataset(self.path, columns=['Report_Date'])['Report_Date']
+        else:
+            dates = pd.read_csv(self.path, usecols=['Report_Date'], parse_dates=['Report_Date'])['Report_Date']
+        # The content the days were processed from is unknown, so each is processed again once
+        return {
+            date_str: {'content_hash': None, 'rows': int(rows)}
+            for date_str, rows in dates.dt.strftime('%m-%d-%Y').value_counts().items()
+        }
+
+    def _remove(self):
+        if self.path.is_dir():
+            shutil.rmtree(self.path)
+        else:
+            self.path.unlink()
+
+    def content_hash(self, date_str: str) -> Optional[str]:
+        """Raw content hash of a stored day, or None if the day is not stored"""
+        with self.lock:
+            return self.days.get(date_str, {}).get('content_hash')
+
+    def stored_dates(self) -> List[str]:
+        """Every stored day, in date order"""
+        with self.lock:
+            return sorted(self.days, key=_date_key)
+
+    def _save_days(self):
+        write_json_atomic(self.days_path, {'partition_by_state': self.partition_by_state, 'days': self.days},
+                          indent=2, sort_keys=True)
+
+    def _append_parquet(self, df: pd.DataFrame, dates: List[str]):
+        """Rewrite only the report months the new days fall in, with their stored days kept"""
+        months = sorted({_report_month(date_str) for date_str in dates})
+        kept = [date_str for date_str in self.days if _report_month(date_str) in months and date_str not in dates]
+        if kept:
+            existing = read_dataset(self.path, min(kept, key=_date_key), max(kept, key=_date_key))
+            existing = existing[existing['Report_Date'].dt.strftime('%m-%d-%Y').isin(kept)]
+            df = pd.concat([existing, df], ignore_index=True)
+        if self.partition_by_state:
+            # Writing replaces only the month/state partitions that get new files, so a state
+            # a re-fetched day no longer has would keep its old rows; the months are cleared first
+            for month in months:
+                shutil.rmtree(self.path / f"{MONTH_COLUMN}={month}", ignore_errors=True)
+        write_dataset(df, self.path, self.partition_by_state)
+
+    def _append_csv(self, df: pd.DataFrame, dates: List[str]):
+        """Append rows in place when they extend the file, rewrite it otherwise"""
+        stored = sorted(self.days, key=_date_key)
+        extends = (
+            self.path.exists()
+            and list(pd.read_csv(self.path, nrows=0).columns) == list(df.columns)
+            and not set(dates) & set(stored)
+            and (not stored or pd.to_datetime(stored[-1], format='%m-%d-%Y') < df['Report_Date'].min())
+        )
+        if extends:
+            df.to_csv(self.path, mode='a', header=False, index=False)
+            return
+
+        if self.path.exists():
+            existing = _read_csv(self.path)
+            existing = existing[~existing['Report_Date'].dt.strftime('%m-%d-%Y').isin(dates)]
+            df = pd.concat([existing, df], ignore_index=True).sort_values('Report_Date', kind='stable')
+        df.to_csv(self.path, index=False)
+
+    def append(self, df: pd.DataFrame, content_hashes: Dict[str, str] = None) -> Path:
+        """
+        Add processed days to the store, replacing any of them already stored.
+
+        Args:
+            df: Combined frame of the new days, with a Report_Date column
+            content_hashes: Raw content hash of each day (MM-DD-YYYY), recorded so an
+                unchanged day can be recognized later
+
+        Returns:
+            Path of the CSV file or dataset directory
+        """
+        if df.empty:
+            return self.path
+
+        report_dates = df['Report_Date'].dt.strftime('%m-%d-%Y')
+        counts = report_dates.value_counts()
+        dates = list(counts.index)
+        with self.lock:
+            if self.fmt == 'csv':
+                self._append_csv(df, dates)
+            else:
+                self._append_parquet(df, dates)
+
+            for date_str in dates:
+                self.days[date_str] = {
+                    'content_hash': (content_hashes or {}).get(date_str),
+                    'rows': int(counts[date_str])
+                }
+            self._save_days()
+        logger.info(f"Appended {len(dates)} days ({len(df)} rows) to {self.path}")
+        return self.path
+
+    def read(self, start_date: str = None, end_date: str = None, states: List[str] = None,
+             columns: List[str] = None) -> pd.DataFrame:
+        """
+        Slice of the store.
+
+        Args:
+            start_date: First report date to load, MM-DD-YYYY (unbounded if None)
+            end_date: Last report date to load, MM-DD-YYYY (unbounded if None)
+            states: Province_State values to load (all if None)
+            columns: Columns to load (all if None)
+
+        Returns:
+            Matching rows in report date order
+        """
+        if not self.path.exists():
+            return pd.DataFrame()
+        if self.fmt == 'parquet':
+            return read_dataset(self.path, start_date, end_date, states, columns)
+
+        df = _read_csv(self.path)
+        if start_date:
+            df = df[df['Report_Date'] >= pd.to_datetime(start_date, format='%m-%d-%Y')]
+        if end_date:
+            df = df[df['Report_Date'] <= pd.to_datetime(end_date, format='%m-%d-%Y')]
+        if states:
+            df = df[df[STATE_COLUMN].isin(states)]
+        return df[columns].reset_index(drop=True) if columns else df.reset_index(drop=True)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Query a combined Parquet dataset")
+    parser.add_argument('command', choices=['query'], help="Operation to run")
+    parser.add_argument('root', type=Path, help="Dataset directory")
+    parser.add_argument('--state', action='append', dest='states', help="State to load (repeatable)")
+    parser.add_argument('--start', help="First report date, MM-DD-YYYY")
+    parser.add_argument('--end', help="Last report date, MM-DD-YYYY")
+    args = parser.parse_args()
+
+    check_combined_format('parquet')
+    started = time.perf_counter()
+    df = read_dataset(args.root, args.start, args.end, args.states)
+    elapsed = time.perf_counter() - started
+    print(f"{len(df)} rows, {df['Report_Date'].nunique() if len(df) else 0} days in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
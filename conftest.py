@@ -0,0 +1,44 @@
+"""
+Shared pytest fixtures: the cached corpus served by the offline replay server,
+and a factory of USCovidFetcher instances that fetch from it.
+"""
+
+import matplotlib
+import pytest
+
+from replay_server import DEFAULT_CORPUS_DIR, start_replay_server
+
+# Tests never show figures
+matplotlib.use('Agg')
+
+
+@pytest.fixture(scope='session')
+def replay_url():
+    """Base URL of a replay server serving the cached corpus"""
+    server, url = start_replay_server(DEFAULT_CORPUS_DIR)
+    yield url
+    server.shutdown()
+
+
+@pytest.fixture
+def make_fetcher(replay_url, tmp_path):
+    """
+    Factory of fetchers over the replay server; each one is closed after the test.
+
+    Fetchers share tmp_path / 'data' unless given another data_dir, so a later
+    fetcher sees the caches and stores an earlier one left behind.
+    """
+    from ai_assist2 import USCovidFetcher
+
+    fetchers = []
+
+    def make(start_date: str, end_date: str, **options):
+        options.setdefault('data_dir', tmp_path / 'data')
+        fetcher = USCovidFetcher(start_date, end_date, graph_dir=tmp_path / 'graphs', base_url=replay_url,
+                                 requests_per_second=1000, **options)
+        fetchers.append(fetcher)
+        return fetcher
+
+    yield make
+    for fetcher in fetchers:
+        fetcher.close()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+"""
+Daily Report Schema
+-------------------
+Declarative description of the JHU CSSE daily report columns shared by
+USCovidFetcher and CovidTracker: the dtype of every known column, the value
+used to fill gaps, and the renames that reconcile spelling changes over the
+years. Normalization casts every column to its declared dtype and fills its
+gaps in a single pass over the frame, instead of one copy per column, so a
+day whose column happens to be inferred differently still comes out the same.
+
+Files are parsed by one of two engines: pyarrow's multithreaded CSV reader
+when it is installed, or the pandas C parser. Both produce identical frames
+once normalized; COVID_PARSE_ENGINE picks one per deployment.
+"""
+
+import logging
+import os
+from io import StringIO
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from raw_store import compression_for
+
+# pyarrow parses CSV on several threads and straight into typed columns, but is optional
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger("us_covid_fetcher.schema")
+
+# 'auto' uses pyarrow when installed and the pandas C parser otherwise
+PARSE_ENGINES = ['auto', 'pyarrow', 'c']
+DEFAULT_PARSE_ENGINE = os.environ.get("COVID_PARSE_ENGINE", "auto")
+
+# Every column seen in the US and global daily reports, with the dtype it is parsed as
+COLUMN_DTYPES = {
+    # Identifiers and labels
+    'FIPS': 'float64',
+    'UID': 'float64',
+    'Admin2': 'str',
+    'Province_State': 'str',
+    'Province/State': 'str',
+    'Country_Region': 'str',
+    'Country/Region': 'str',
+    'Combined_Key': 'str',
+    'ISO3': 'str',
+    'Date': 'str',
+    'Last_Update': 'str',
+    'Last Update': 'str',
+    # Coordinates
+    'Lat': 'float64',
+    'Long_': 'float64',
+    'Latitude': 'float64',
+    'Longitude': 'float64',
+    # Counts (parsed as float so gaps survive until they are filled)
+    'Confirmed': 'float64',
+    'Deaths': 'float64',
+    'Recovered': 'float64',
+    'Active': 'float64',
+    'Total_Test_Results': 'float64',
+    'People_Hospitalized': 'float64',
+    'People_Tested': 'float64',
+    # Rates
+    'Incident_Rate': 'float64',
+    'Incidence_Rate': 'float64',
+    'Case_Fatality_Ratio': 'float64',
+    'Case-Fatality_Ratio': 'float64',
+    'Testing_Rate': 'float64',
+    'Hospitalization_Rate': 'float64',
+    'Mortality_Rate': 'float64',
+}
+
+# Columns (canonical names) every usable daily report has
+REQUIRED_COLUMNS = ['Province_State', 'Confirmed', 'Deaths']
+
+# Columns that are always whole numbers once gaps are filled
+INT_COLUMNS = ['Confirmed', 'Deaths']
+
+# Columns that only ever hold whole numbers, though gaps make most of them parse as float
+WHOLE_NUMBER_COLUMNS = INT_COLUMNS + [
+    'FIPS', 'UID', 'Recovered', 'Active', 'Total_Test_Results', 'People_Hospitalized', 'People_Tested',
+]
+
+# Counts many states never report; their gaps are kept so "not reported" stays distinct from 0
+UNFILLED_COLUMNS = ['Recovered', 'Active']
+
+# Spelling variations reconciled to a single name
+COLUMN_RENAMES = {
+    'Case-Fatality_Ratio': 'Case_Fatality_Ratio',
+    'Incident_Rate': 'Incidence_Rate',
+    'Last Update': 'Last_Update',
+    # Early 2020 layout
+    'Province/State': 'Province_State',
+    'Country/Region': 'Country_Region',
+    'Latitude': 'Lat',
+    'Longitude': 'Long_',
+}
+
+# Value used for missing entries, by dtype
+FILL_VALUES = {
+    'float64': 0,
+    'str': '',
+}
+
+# Version of the parse and normalization pipeline both fetchers share; caches and
+# stores keyed by it are rebuilt after a bump. Bump whenever the processed output changes
+PROCESSING_VERSION = 6
+
+
+def resolve_parse_engine(engine: str) -> str:
+    """
+    Resolve a configured parse engine to the one that will actually run.
+
+    Raises:
+        ValueError: For an unknown engine, or 'pyarrow' when it is not installed
+    """
+    if engine not in PARSE_ENGINES:
+        raise ValueError(f"Unsupported parse engine: {engine}. Use one of {PARSE_ENGINES}")
+    if engine == 'auto':
+        return 'pyarrow' if PYARROW_AVAILABLE else 'c'
+    if engine == 'pyarrow' and not PYARROW_AVAILABLE:
+        raise ValueError("The pyarrow parse engine requires the 'pyarrow' package")
+    return engine
+
+
+# Looks up the header plan for a list of column names, e.g. SchemaRegistry.plan_for
+PlanLookup = Callable[[List[str]], Dict]
+
+
+def _read_with_pandas(source: Union[str, Path], plan_for: Optional[PlanLookup]) -> Tuple[pd.DataFrame, Optional[Dict]]:
+    """Parse with the pandas C parser, keeping the plan's or else the known columns"""
+    # Round-trip float parsing is exact, like pyarrow's; the default can be one ULP off.
+    # On the daily report corpus it costs about 0.1 ms per file, a few percent of the parse
+    options = {'float_precision': 'round_trip'}
+    if plan_for is None:
+        options['usecols'] = lambda col: col in COLUMN_DTYPES
+    if isinstance(source, Path):
+        # Plain files are memory-mapped; pandas decompresses the others as it parses
+        df = pd.read_csv(source, memory_map=compression_for(source) is None, **options)
+    else:
+        df = pd.read_csv(StringIO(source), **options)
+
+    if plan_for is None:
+        return df, None
+    plan = plan_for(list(df.columns))
+    return df[plan['columns']], plan
+
+
+def _read_with_pyarrow(source: Union[str, Path], plan_for: Optional[PlanLookup]) -> Tuple[pd.DataFrame, Optional[Dict]]:
+    """Parse with pyarrow's multithreaded reader, typing the known columns as declared"""
+    def read(column_types):
+        # pyarrow picks the decompression of a file from its suffix
+        target = str(source) if isinstance(source, Path) else pa.BufferReader(source.encode('utf-8'))
+        return pa_csv.read_csv(target, convert_options=pa_csv.ConvertOptions(column_types=column_types))
+
+    # Declared types stop pyarrow from turning Last_Update into timestamps or
+    # FIPS into integers; columns absent from a given day are simply ignored
+    arrow_types = {col: pa.float64() if dtype == 'float64' else pa.string() for col, dtype in COLUMN_DTYPES.items()}
+    table = read(arrow_types)
+    if plan_for is None:
+        return table.select([col for col in table.column_names if col in COLUMN_DTYPES]).to_pandas(), None
+
+    plan = plan_for(table.column_names)
+    learned = {col: arrow_types[name] for col, name in plan['renames'].items() if col not in arrow_types}
+    if learned:
+        # Names only the registry knows were parsed with inferred types; rare enough to read twice
+        table = read({**arrow_types, **learned})
+    return table.select(plan['columns']).to_pandas(), plan
+
+
+def read_daily_csv(source: Union[str, Path], engine: str = DEFAULT_PARSE_ENGINE,
+                   plan_for: PlanLookup = None) -> Tuple[pd.DataFrame, Optional[Dict]]:
+    """
+    Parse a daily report, keeping only the known columns.
+
+    The header plan is looked up from the header the parser returns, so the file
+    is not opened a second time just to read its first line.
+
+    Args:
+        source: Raw CSV content as string, or the path of a (possibly compressed) CSV file
+        engine: 'pyarrow', 'c' (the pandas parser), or 'auto' for the fastest one installed
+        plan_for: Header plan lookup, usually SchemaRegistry.plan_for; the columns the
+            plan keeps are returned (every column the schema knows by name if None)
+
+    Returns:
+        Parsed, not yet normalized DataFrame, and the plan it was read with (None without plan_for)
+    """
+    if resolve_parse_engine(engine) == 'pyarrow':
+        try:
+            return _read_with_pyarrow(source, plan_for)
+        except pa.ArrowInvalid as e:
+            # A malformed value in a numeric column; the pandas path coerces it during normalization
+            logger.warning(f"pyarrow could not parse the file ({e}), falling back to the pandas parser")
+    return _read_with_pandas(source, plan_for)
+
+
+def _numeric_values(series: pd.Series, fill: float = FILL_VALUES['float64']) -> np.ndarray:
+    """Column as float64 with gaps set to fill, coercing malformed entries to gaps"""
+    if series.dtype == 'float64':
+        # The usual case: one copy, with the gaps found on the raw array rather than through pandas' isna
+        values = series.to_numpy(dtype='float64', copy=True)
+        if not np.isnan(fill):
+            values[np.isnan(values)] = fill
+        return values
+    try:
+        return series.to_numpy(dtype='float64', na_value=fill)
+    except (TypeError, ValueError):
+        logger.warning(f"Malformed values in numeric column {series.name}, coercing them to gaps")
+        return pd.to_numeric(series, errors='coerce').to_numpy(dtype='float64', na_value=fill)
+
+
+def normalize_daily_frame(df: pd.DataFrame, plan: Dict = None) -> pd.DataFrame:
+    """
+    Apply the declared schema in one pass: cast every column to its declared
+    dtype, fill gaps (except in UNFILLED_COLUMNS, which keep NaN), fix integer
+    columns and reconcile column names.
+
+    The frame is rebuilt once from the converted column arrays rather than
+    patched column by column, so each column is copied at most once.
+
+    Args:
+        df: Frame returned by read_daily_csv
+        plan: Header plan the frame was read with (defaults to the fixed COLUMN_RENAMES)
+
+    Returns:
+        A new normalized frame
+    """
+    renames = plan['renames'] if plan else COLUMN_RENAMES
+    columns = {}
+    for col, series in df.items():
+        name = renames.get(col, col)
+        if COLUMN_DTYPES[name] == 'float64':
+            values = _numeric_values(series, np.nan if name in UNFILLED_COLUMNS else FILL_VALUES['float64'])
+            if name in INT_COLUMNS:
+                values = values.astype('int64')
+        else:
+            if series.dtype != 'str':
+                # A column that is empty for the whole day is inferred as float; it still holds text
+                series = series.astype(object).fillna(FILL_VALUES['str']).astype('str')
+            elif series.hasnans:
+                series = series.fillna(FILL_VALUES['str'])
+            values = series
+        columns[name] = values
+
+    return pd.DataFrame(columns, index=df.index, copy=False)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Daily Report Parsing
+--------------------
+The per-file parse pipeline of USCovidFetcher (read with the header plan,
+normalize, parse timestamps, stamp the report date), usable both in-process
+and fanned out over a process pool.
+
+Worker processes hand their frames back as Arrow IPC streams when pyarrow is
+installed: the parent maps the buffers straight into columns instead of
+unpickling a DataFrame object by object. Without pyarrow the frames are
+pickled as usual.
+"""
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from csv_schema import PYARROW_AVAILABLE, REQUIRED_COLUMNS, PlanLookup, normalize_daily_frame, read_daily_csv
+from retry_policy import FetchMetrics
+from timestamp_formats import TimestampFormatRegistry
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+
+logger = logging.getLogger("us_covid_fetcher.parse")
+
+# (raw content or path, MM-DD-YYYY, parse engine, header plan)
+ParseTask = Tuple[Union[str, Path], str, str, Dict]
+
+# Each worker process keeps one registry so the detected format carries over between its files
+_worker_timestamp_formats: Optional[TimestampFormatRegistry] = None
+
+
+def parse_daily_report(raw_content: Union[str, Path], date_str: str, engine: str, plan_for: PlanLookup,
+                       timestamp_formats: TimestampFormatRegistry, metrics: FetchMetrics = None) -> pd.DataFrame:
+    """
+    Parse one daily report into its processed frame.
+
+    Args:
+        raw_content: Raw CSV content as string, or the path of the CSV file
+        date_str: Date in format MM-DD-YYYY
+        engine: Parse engine passed to read_daily_csv
+        plan_for: Header plan lookup, usually SchemaRegistry.plan_for
+        timestamp_formats: Registry used to parse Last_Update
+        metrics: Where to count timestamp parse failures (optional)
+
+    Returns:
+        Processed DataFrame, empty if the file lacks the required columns
+    """
+    # Keep only the columns the plan for the parsed header keeps
+    df, plan = read_daily_csv(raw_content, engine, plan_for)
+
+    # Check that this is valid data with expected columns
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        logger.warning(f"CSV for {date_str} missing required columns. Found: {df.columns.tolist()}")
+        return pd.DataFrame()
+
+    # Apply the declared dtypes, fill missing values and fix column names in one pass
+    df = normalize_daily_frame(df, plan)
+
+    # Convert date columns with the format detected for this file
+    if 'Last_Update' in df.columns:
+        df['Last_Update'], _ = timestamp_formats.parse(df['Last_Update'], metrics)
+
+    # Add the date as a column for reference
+    df['Report_Date'] = pd.to_datetime(date_str, format='%m-%d-%Y')
+    return df
+
+
+def encode_frame(df: pd.DataFrame):
+    """Serialize a frame for the trip back to the parent process"""
+    if not PYARROW_AVAILABLE:
+        return df
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def decode_frame(payload) -> pd.DataFrame:
+    """Inverse of encode_frame"""
+    if isinstance(payload, pd.DataFrame):
+        return payload
+    return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+
+def _parse_task(task: ParseTask):
+    """
+    Process-pool entry point.
+
+    Returns:
+        (encoded frame or None, error message or None, metric counters, parse seconds)
+    """
+    global _worker_timestamp_formats
+    if _worker_timestamp_formats is None:
+        _worker_timestamp_formats = TimestampFormatRegistry()
+
+    raw_content, date_str, engine, plan = task
+    metrics = FetchMetrics()
+    started = time.perf_counter()
+    try:
+        # The parent looked the plan up already; workers have no registry of their own
+        df = parse_daily_report(raw_content, date_str, engine, lambda columns: plan, _worker_timestamp_formats, metrics)
+        payload = encode_frame(df) if not df.empty else None
+        return payload, None, metrics.counters, time.perf_counter() - started
+    except Exception as e:
+        return None, str(e), metrics.counters, time.perf_counter() - started
+
+
+def parse_in_processes(tasks: List[ParseTask], workers: int,
+                       metrics: FetchMetrics = None) -> Iterator[Tuple[Optional[pd.DataFrame], Optional[str], float]]:
+    """
+    Parse daily reports on a pool of worker processes.
+
+    Args:
+        tasks: One (raw content or path, date, engine, plan) tuple per file
+        workers: Number of worker processes
+        metrics: Where to add the counters collected in the workers (optional)
+
+    Yields:
+        (frame or None, error message or None, parse seconds) per task, in task order
+    """
+    # Several small files per round trip keeps the IPC overhead per file low
+    chunksize = max(1, len(tasks) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for payload, error, counters, seconds in executor.map(_parse_task, tasks, chunksize=chunksize):
+            if metrics:
+                for name, amount in counters.items():
+                    metrics.increment(name, amount)
+            yield (decode_frame(payload) if payload is not None else None), error, seconds
@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+"""
+Derived Metrics Table
+---------------------
+SQLite table of the per-state and national daily series the plots are drawn
+from: cumulative Confirmed/Deaths and rates per report date, the daily
+New_Cases/New_Deaths (difference to the previous day, negative
+corrections clipped to zero) and their 7-day rolling means. Only consecutive
+calendar days are differenced: a series restarts after any gap, such as the
+months between two separately fetched ranges, so the first day after it has
+no new cases and the next six no rolling mean.
+
+The table is maintained incrementally. Adding a day only upserts that day's
+totals, deletes the rows of series the day no longer has, and marks the rows
+whose totals actually changed (or that follow a deleted row) as pending; refresh()
+then recomputes, per series, the pending rows and the seven rows after each
+of them (the only rows whose difference or rolling window includes a changed
+total), reading seven rows of context before the first one. A nightly run
+that appends one day recomputes one row per series instead of the whole
+history.
+
+Usage:
+    python derived_metrics.py --table us_covid_data/covid_metrics.sqlite --series Texas
+    python derived_metrics.py --table us_covid_data/covid_metrics.sqlite --export metrics.csv
+"""
+
+import argparse
+from datetime import date
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from storage import LockedSQLite
+
+DERIVED_METRICS_FILE = "covid_metrics.sqlite"
+
+# Series name of the national totals; no state has an empty name
+NATIONAL_SERIES = ''
+
+ROLLING_WINDOW = 7
+
+TOTAL_COLUMNS = ['Confirmed', 'Deaths', 'Incidence_Rate', 'Case_Fatality_Ratio']
+DERIVED_COLUMNS = ['New_Cases', 'New_Deaths', 'New_Cases_7day_Avg', 'New_Deaths_7day_Avg']
+TOTALS_SELECT = ", ".join(f'"{col}"' for col in TOTAL_COLUMNS)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS derived_metrics (
+        series TEXT NOT NULL,               -- Province_State, or '' for the national totals
+        "Report_Date" TEXT NOT NULL,        -- YYYY-MM-DD
+        "Confirmed" REAL,
+        "Deaths" REAL,
+        "Incidence_Rate" REAL,
+        "Case_Fatality_Ratio" REAL,
+        "New_Cases" REAL,
+        "New_Deaths" REAL,
+        "New_Cases_7day_Avg" REAL,
+        "New_Deaths_7day_Avg" REAL,
+        pending INTEGER NOT NULL DEFAULT 1, -- totals changed since the derived columns were computed
+        PRIMARY KEY (series, "Report_Date")
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_pending ON derived_metrics (pending) WHERE pending = 1",
+]
+
+
+def daily_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-series totals of processed rows, one row per (series, Report_Date).
+
+    A state's totals are the largest cumulative values among its rows with
+    confirmed cases; the national totals sum the counts of every row and
+    average the rates.
+    """
+    columns = [col for col in TOTAL_COLUMNS if col in df.columns]
+    if df.empty or 'Confirmed' not in columns or 'Report_Date' not in df.columns:
+        return pd.DataFrame(columns=['series', 'Report_Date'] + TOTAL_COLUMNS)
+
+    frames = []
+    if 'Province_State' in df.columns:
+        with_cases = df[df['Confirmed'] > 0]
+        states = with_cases.groupby(['Province_State', 'Report_Date'], observed=True)[columns].max().reset_index()
+        frames.append(states.rename(columns={'Province_State': 'series'}))
+
+    aggregations = {col: 'sum' if col in ('Confirmed', 'Deaths') else 'mean' for col in columns}
+    national = df.groupby('Report_Date').agg(aggregations).reset_index()
+    national.insert(0, 'series', NATIONAL_SERIES)
+    frames.append(national)
+
+    totals = pd.concat(frames, ignore_index=True)
+    totals['series'] = totals['series'].astype(object)
+    return totals.reindex(columns=['series', 'Report_Date'] + TOTAL_COLUMNS)
+
+
+def _consecutive_runs(totals: pd.DataFrame, by: str = None) -> pd.Series:
+    """
+    Number the runs of consecutive report dates in daily totals sorted by date.
+
+    Args:
+        totals: Totals of one series, or of several in contiguous blocks
+        by: Column naming the series when there are several
+
+    Returns:
+        Run number of every row, unique across series
+    """
+    dates = pd.to_datetime(totals['Report_Date'])
+    steps = dates.groupby(totals[by], sort=False).diff() if by else dates.diff()
+    # The first row of a series has no step (NaT) and starts a run like a gap does
+    return (steps != pd.Timedelta(days=1)).cumsum()
+
+
+def derive(totals: pd.DataFrame, by: str = None) -> pd.DataFrame:
+    """
+    Add the derived columns to daily totals sorted by date.
+
+    Args:
+        totals: Totals of one series, or of several in contiguous blocks
+        by: Column naming the series when there are several
+
+    Returns:
+        The frame with New_Cases, New_Deaths and their 7-day rolling means,
+        restarted after every gap in the report dates
+    """
+    totals = totals.reset_index(drop=True)
+    runs = _consecutive_runs(totals, by)
+    for total, new in (('Confirmed', 'New_Cases'), ('Deaths', 'New_Deaths')):
+        differences = totals[total].astype(float).groupby(runs, sort=False).diff()
+        # Negative differences are data corrections
+        totals[new] = differences.fillna(0).clip(lower=0)
+    # Added after both differences, in the order of DERIVED_COLUMNS
+    for new in ('New_Cases', 'New_Deaths'):
+        rolling = totals[new].groupby(runs, sort=False).rolling(ROLLING_WINDOW).mean()
+        totals[f'{new}_7day_Avg'] = rolling.reset_index(level=0, drop=True)
+    return totals
+
+
+def _row_values(values) -> tuple:
+    """Row values as sqlite3 binds and returns them, with missing values as None"""
+    return tuple(None if pd.isna(value) else float(value) for value in values)
+
+
+class DerivedMetricsTable(LockedSQLite):
+    """Thread-safe, incrementally maintained SQLite table of derived daily metrics"""
+
+    def __init__(self, path: Path):
+        super().__init__(path, SCHEMA)
+
+    def add_day(self, df: pd.DataFrame) -> int:
+        """
+        Upsert the totals of a processed day and mark the changed rows pending.
+
+        Series stored for the date but absent from the frame (a state dropped from
+        a re-fetched day, or whose Confirmed fell to 0) lose their row for it, and
+        their next row is marked pending instead.
+
+        Args:
+            df: Processed frame of one report date
+
+        Returns:
+            Number of series whose totals changed or were removed
+        """
+        totals = daily_totals(df)
+        if totals.empty:
+            return 0
+
+        report_dates = totals['Report_Date'].dt.strftime('%Y-%m-%d').tolist()
+        placeholders = ", ".join("?" * len(set(report_dates)))
+
+        with self.lock:
+            stored = {
+                (row[0], row[1]): row[2:]
+                for row in self.conn.execute(
+                    f'SELECT series, "Report_Date", {TOTALS_SELECT} FROM derived_metrics '
+                    f'WHERE "Report_Date" IN ({placeholders})', sorted(set(report_dates))
+                )
+            }
+
+            changed = []
+            for series, report_date, values in zip(totals['series'], report_dates,
+                                                   totals[TOTAL_COLUMNS].itertuples(index=False)):
+                values = _row_values(values)
+                if stored.get((series, report_date)) != values:
+                    changed.append((series, report_date) + values)
+            present = set(zip(totals['series'], report_dates))
+            removed = [key for key in stored if key not in present]
+
+            if removed:
+                with self.conn:
+                    self.conn.executemany(
+                        'DELETE FROM derived_metrics WHERE series = ? AND "Report_Date" = ?', removed
+                    )
+                    # The next row's difference and the rolling means after it spanned the
+                    # deleted row; refresh() recomputes a pending row and the ROLLING_WINDOW after it
+                    self.conn.executemany(
+                        'UPDATE derived_metrics SET pending = 1 WHERE series = :series AND "Report_Date" = '
+                        '(SELECT MIN("Report_Date") FROM derived_metrics '
+                        'WHERE series = :series AND "Report_Date" > :date)',
+                        [{'series': series, 'date': report_date} for series, report_date in removed]
+                    )
+            if changed:
+                with self.conn:
+                    self.conn.executemany(
+                        f'INSERT INTO derived_metrics (series, "Report_Date", {TOTALS_SELECT}, pending) '
+                        f'VALUES (?, ?, {", ".join("?" * len(TOTAL_COLUMNS))}, 1) '
+                        f'ON CONFLICT (series, "Report_Date") DO UPDATE SET '
+                        + ", ".join(f'"{col}" = excluded."{col}"' for col in TOTAL_COLUMNS)
+                        + ", pending = 1",
+                        changed
+                    )
+        return len(changed) + len(removed)
+
+    def _segment(self, series: str, first: str, last: str) -> List[tuple]:
+        """Rows of a series from ROLLING_WINDOW rows before `first` to ROLLING_WINDOW rows after `last`"""
+        # A changed total changes its own difference and the next row's, so the rolling
+        # means of the ROLLING_WINDOW rows after it; recomputing the first of those needs
+        # ROLLING_WINDOW differences, hence ROLLING_WINDOW totals before it
+        return self.conn.execute(
+            f'SELECT series, "Report_Date", {TOTALS_SELECT}, pending FROM derived_metrics '
+            """WHERE series = :series AND "Report_Date" BETWEEN
+                COALESCE((SELECT "Report_Date" FROM derived_metrics WHERE series = :series AND "Report_Date" < :first
+                          ORDER BY "Report_Date" DESC LIMIT 1 OFFSET :offset), '')
+                AND COALESCE((SELECT "Report_Date" FROM derived_metrics WHERE series = :series AND "Report_Date" > :last
+                              ORDER BY "Report_Date" LIMIT 1 OFFSET :offset), '9999-12-31')
+               ORDER BY "Report_Date" """,
+            {'series': series, 'first': first, 'last': last, 'offset': ROLLING_WINDOW - 1}
+        ).fetchall()
+
+    def refresh(self) -> int:
+        """
+        Recompute the derived columns of every row that depends on a changed day.
+
+        Returns:
+            Number of rows recomputed
+        """
+        with self.lock:
+            ranges = self.conn.execute(
+                'SELECT series, MIN("Report_Date"), MAX("Report_Date") FROM derived_metrics '
+                'WHERE pending = 1 GROUP BY series'
+            ).fetchall()
+            if not ranges:
+                return 0
+
+            rows = []
+            for series, first, last in ranges:
+                rows.extend(self._segment(series, first, last))
+            segments = derive(pd.DataFrame(rows, columns=['series', 'Report_Date'] + TOTAL_COLUMNS + ['pending']),
+                              by='series')
+
+            # Rows at most ROLLING_WINDOW rows after a pending row of the same series
+            positions = np.arange(len(segments))
+            last_pending = pd.Series(np.where(segments['pending'] == 1, positions, np.nan)).groupby(
+                segments['series'], sort=False).ffill()
+            updated = segments[(positions - last_pending) <= ROLLING_WINDOW]
+
+            updates = [
+                _row_values(values) + (series, report_date)
+                for series, report_date, values in zip(updated['series'], updated['Report_Date'],
+                                                       updated[DERIVED_COLUMNS].itertuples(index=False))
+            ]
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE derived_metrics SET "
+                    + ", ".join(f'"{col}" = ?' for col in DERIVED_COLUMNS)
+                    + ', pending = 0 WHERE series = ? AND "Report_Date" = ?',
+                    updates
+                )
+        return len(updates)
+
+    def series(self, name: str, start: date = None, end: date = None) -> pd.DataFrame:
+        """
+        One series ordered by report date, refreshed first if any day changed.
+
+        Args:
+            name: Province_State, or NATIONAL_SERIES for the national totals
+            start: First report date (unbounded if None)
+            end: Last report date (unbounded if None)
+
+        Returns:
+            Report_Date, the totals and the derived columns
+        """
+        self.refresh()
+        where, params = 'series = ?', [name]
+        if start is not None:
+            where += ' AND "Report_Date" >= ?'
+            params.append(start.strftime('%Y-%m-%d'))
+        if end is not None:
+            where += ' AND "Report_Date" <= ?'
+            params.append(end.strftime('%Y-%m-%d'))
+
+        select = ", ".join(f'"{col}"' for col in ['Report_Date'] + TOTAL_COLUMNS + DERIVED_COLUMNS)
+        with self.lock:
+            df = pd.read_sql_query(
+                f'SELECT {select} FROM derived_metrics WHERE {where} ORDER BY "Report_Date"', self.conn, params=params
+            )
+        df['Report_Date'] = pd.to_datetime(df['Report_Date'], format='%Y-%m-%d')
+        columns = TOTAL_COLUMNS + DERIVED_COLUMNS
+        df[columns] = df[columns].astype(float)
+        # Rates the reports of this range never had come back all NULL
+        return df.drop(columns=[col for col in ('Incidence_Rate', 'Case_Fatality_Ratio') if df[col].isna().all()])
+
+    def missing_days(self, dates: List[str]) -> List[str]:
+        """Report dates (MM-DD-YYYY) that were never added to the table"""
+        with self.lock:
+            stored = {
+                row[0] for row in self.conn.execute(
+                    'SELECT "Report_Date" FROM derived_metrics WHERE series = ?', (NATIONAL_SERIES,)
+                )
+            }
+        return [date_str for date_str in dates
+                if pd.to_datetime(date_str, format='%m-%d-%Y').strftime('%Y-%m-%d') not in stored]
+
+    def series_names(self) -> List[str]:
+        """Every state in the table, sorted"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT series FROM derived_metrics WHERE series != ? ORDER BY series", (NATIONAL_SERIES,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def export(self, path: Path, start: date = None, end: date = None) -> Path:
+        """Write every series to a CSV file, the national totals under the name 'US'"""
+        frames = []
+        for name in [NATIONAL_SERIES] + self.series_names():
+            df = self.series(name, start, end)
+            df.insert(0, 'Series', name or 'US')
+            frames.append(df)
+        pd.concat(frames, ignore_index=True).to_csv(path, index=False)
+        return path
+
+    def summary(self) -> Dict[str, object]:
+        """Number of series and rows, and the date span"""
+        with self.lock:
+            series, rows, first, last = self.conn.execute(
+                'SELECT COUNT(DISTINCT series), COUNT(*), MIN("Report_Date"), MAX("Report_Date") FROM derived_metrics'
+            ).fetchone()
+        return {'series': series, 'rows': rows, 'first': first, 'last': last}
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Inspect or export the derived metrics table")
+    parser.add_argument('--table', type=Path, default=Path("us_covid_data") / DERIVED_METRICS_FILE,
+                        help="Path of the metrics database")
+    parser.add_argument('--series', help="Print the series of this state ('US' for the national totals)")
+    parser.add_argument('--export', type=Path, help="Write every series to this CSV file")
+    args = parser.parse_args()
+
+    if not args.table.exists():
+        print(f"No metrics table at {args.table}")
+        return
+
+    table = DerivedMetricsTable(args.table)
+    table.refresh()
+    summary = table.summary()
+    print(f"{summary['series']} series, {summary['rows']} rows ({summary['first']} to {summary['last']})")
+    if args.series:
+        name = NATIONAL_SERIES if args.series == 'US' else args.series
+        print(table.series(name).to_string(index=False))
+    if args.export:
+        print(f"Exported to {table.export(args.export)}")
+    table.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+US COVID-19 Fetch Benchmark
+---------------------------
+Measures the throughput of USCovidFetcher.fetch_all_dates against the offline
+replay server (see replay_server.py), comparing the serial path with parallel
+runs. Every run starts from an empty data directory so each date is a real
+HTTP request; requests/sec, p50/p99 request latency and wall time are reported.
+
+Usage:
+    python fetch_benchmark.py --start 01-01-2021 --end 06-30-2022 --workers 4 8 --latency-ms 80
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ai_assist2 import DATA_DIR, USCovidFetcher
+from replay_server import start_replay_server
+
+logger = logging.getLogger("us_covid_fetcher.benchmark")
+
+
+def time_fetch(base_url: str, start_date: str, end_date: str, workers: int,
+               requests_per_second: float) -> Tuple[float, USCovidFetcher]:
+    """Run one cold fetch into a scratch directory and return the wall time"""
+    with tempfile.TemporaryDirectory() as tmp:
+        fetcher = USCovidFetcher(
+            start_date=start_date,
+            end_date=end_date,
+            data_dir=Path(tmp) / "data",
+            graph_dir=Path(tmp) / "graphs",
+            base_url=base_url,
+            max_workers=workers,
+            requests_per_second=requests_per_second,
+            burst=workers
+        )
+        started = time.perf_counter()
+        fetcher.fetch_all_dates()
+        elapsed = time.perf_counter() - started
+        fetcher.close()
+        return elapsed, fetcher
+
+
+def run_benchmark(start_date: str, end_date: str, worker_counts: List[int],
+                  requests_per_second: float, corpus_dir: Path = DATA_DIR,
+                  **fault_options) -> List[Dict]:
+    """
+    Compare serial and parallel fetch throughput against the replay server.
+
+    Args:
+        start_date: Start date in format 'MM-DD-YYYY'
+        end_date: End date in format 'MM-DD-YYYY'
+        worker_counts: Worker counts to benchmark; 1 is always included as the baseline
+        requests_per_second: Per-host rate limit used for every run
+        corpus_dir: Directory holding the cached daily CSV files
+        fault_options: Latency and fault injection passed to start_replay_server
+
+    Returns:
+        One dict of results per worker count
+    """
+    server, base_url = start_replay_server(corpus_dir, **fault_options)
+    try:
+        worker_counts = sorted(set([1] + worker_counts))
+        baseline = None
+        results = []
+
+        for workers in worker_counts:
+            logger.info(f"Benchmarking {workers} worker(s)")
+            elapsed, fetcher = time_fetch(base_url, start_date, end_date, workers, requests_per_second)
+            metrics = fetcher.metrics.summary()
+
+            if baseline is None:
+                baseline = fetcher.data
+                identical = True
+            else:
+                identical = fetcher.data.equals(baseline)
+
+            results.append({
+                'workers': workers,
+                'wall_s': elapsed,
+                'requests': metrics.get('requests', 0),
+                'req_per_s': metrics.get('requests', 0) / elapsed,
+                'p50_ms': metrics.get('latency_p50_ms', 0.0),
+                'p99_ms': metrics.get('latency_p99_ms', 0.0),
+                'retries': metrics.get('retries', 0),
+                'identical': identical,
+            })
+
+        serial_time = results[0]['wall_s']
+        print(f"\n{'workers':>8} {'wall (s)':>9} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'retries':>8} {'speedup':>8} {'identical':>10}")
+        for r in results:
+            print(f"{r['workers']:>8} {r['wall_s']:>9.2f} {r['requests']:>9} {r['req_per_s']:>8.1f} "
+                  f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['retries']:>8} "
+                  f"{serial_time / r['wall_s']:>7.1f}x {str(r['identical']):>10}")
+        return results
+
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark US COVID fetches against the offline replay server")
+    parser.add_argument('--start', default="01-01-2021", help="Start date (MM-DD-YYYY)")
+    parser.add_argument('--end', default="06-30-2022", help="End date (MM-DD-YYYY)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 8], help="Parallel worker counts to compare")
+    parser.add_argument('--rps', type=float, default=100.0, help="Per-host requests per second")
+    parser.add_argument('--corpus', type=Path, default=DATA_DIR, help="Directory of cached daily CSVs")
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Injected latency per response")
+    parser.add_argument('--jitter-ms', type=float, default=20.0, help="Injected random extra latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--missing-rate', type=float, default=0.0, help="Fraction of dates answered with 404")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for fault injection")
+    args = parser.parse_args()
+
+    # The fetcher logs every date; only show warnings while benchmarking
+    logging.getLogger("us_covid_fetcher").setLevel(logging.WARNING)
+
+    run_benchmark(
+        args.start, args.end, args.workers, args.rps, args.corpus,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        missing_rate=args.missing_rate,
+        seed=args.seed
+    )
+
+
+if __name__ == "__main__":
+    main()
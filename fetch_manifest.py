@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Fetch Manifest
+--------------
+SQLite record of every date the fetcher has handled: whether it succeeded,
+how large the raw file was, its content hash, when it was fetched, how long
+parsing took and how many rows it produced. Incremental runs use it to work
+out which dates still need fetching, and a crashed run picks up where it
+stopped because every date is committed as soon as it is processed.
+
+Usage:
+    python fetch_manifest.py --manifest us_covid_data/fetch_manifest.sqlite
+"""
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from storage import LockedSQLite
+
+MANIFEST_FILE = "fetch_manifest.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest (
+    report_date TEXT PRIMARY KEY,       -- MM-DD-YYYY
+    status TEXT NOT NULL,               -- 'ok' or 'failed'
+    byte_size INTEGER,
+    content_hash TEXT,
+    processing_version INTEGER,
+    fetched_at TEXT,
+    parse_seconds REAL,
+    row_count INTEGER,
+    error TEXT
+)
+"""
+
+
+class FetchManifest(LockedSQLite):
+    """Thread-safe SQLite manifest of per-date fetch results"""
+
+    def __init__(self, path: Path):
+        super().__init__(path, [SCHEMA])
+
+    def record_success(self, date_str: str, byte_size: int, content_hash: str,
+                       processing_version: int, parse_seconds: float, row_count: int):
+        """Record a date that was fetched and processed"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO manifest VALUES (?, 'ok', ?, ?, ?, ?, ?, ?, NULL)",
+                (date_str, byte_size, content_hash, processing_version,
+                 datetime.now().isoformat(timespec='seconds'), parse_seconds, row_count)
+            )
+            self.conn.commit()
+
+    def record_failure(self, date_str: str, error: str):
+        """Record a date that could not be fetched or processed"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO manifest (report_date, status, fetched_at, error) VALUES (?, 'failed', ?, ?)",
+                (date_str, datetime.now().isoformat(timespec='seconds'), error)
+            )
+            self.conn.commit()
+
+    def completed(self, dates: List[str], processing_version: int) -> Dict[str, str]:
+        """
+        Return the content hash of every date in `dates` already processed with this version.
+
+        Dates that failed, were never seen, or were processed by older logic are left
+        out, which makes them the ones an incremental run still has to handle.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT report_date, content_hash FROM manifest WHERE status = 'ok' AND processing_version = ?",
+                (processing_version,)
+            ).fetchall()
+
+        wanted = set(dates)
+        return {report_date: digest for report_date, digest in rows if report_date in wanted}
+
+    def summary(self) -> Dict[str, int]:
+        """Count manifest entries by status"""
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM manifest GROUP BY status").fetchall()
+        return dict(rows)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Show the state of the fetch manifest")
+    parser.add_argument('--manifest', type=Path, default=Path("us_covid_data") / MANIFEST_FILE,
+                        help="Path of the manifest database")
+    args = parser.parse_args()
+
+    if not args.manifest.exists():
+        print(f"No manifest at {args.manifest}")
+        return
+
+    manifest = FetchManifest(args.manifest)
+    for status, count in sorted(manifest.summary().items()):
+        print(f"{status:>8}: {count}")
+    manifest.close()
+
+
+if __name__ == "__main__":
+    main()
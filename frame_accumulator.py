@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+Columnar Frame Accumulator
+--------------------------
+Builds the combined dataset one day at a time. Each day's columns are copied
+into growable typed buffers (numpy arrays that double in capacity when full),
+so the per-day frames can be dropped as soon as they are appended, and the
+final DataFrame is built from views of the buffers without another copy.
+Collecting every frame in a list and calling pd.concat at the end keeps all
+of them alive next to the concatenated result, roughly doubling peak memory.
+
+Columns of numpy dtypes (ints, floats, bools, datetimes) and categoricals
+sharing one append-only CategoricalDtype (see categories.py) are buffered.
+Any other column (strings, nullable ints) is kept as a list of per-day
+arrays and joined once at the end. A column missing from some days is padded
+with NA, upcasting ints to float like pd.concat does.
+"""
+
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("us_covid_fetcher.accumulator")
+
+INITIAL_CAPACITY = 4096
+
+
+class _BufferColumn:
+    """A numpy column that grows by doubling its capacity"""
+
+    def __init__(self, dtype: np.dtype, size: int = 0, capacity: int = INITIAL_CAPACITY):
+        self.buffer = np.empty(max(capacity, size), dtype=dtype)
+        self.size = 0
+        if size:
+            self.pad(size)
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        if needed > len(self.buffer):
+            grown = np.empty(max(needed, len(self.buffer) * 2), dtype=self.buffer.dtype)
+            grown[:self.size] = self.buffer[:self.size]
+            self.buffer = grown
+
+    def _promote(self, dtype: np.dtype):
+        """Switch the buffer to a wider dtype, as pd.concat would for mixed days"""
+        promoted = np.result_type(self.buffer.dtype, dtype)
+        if promoted != self.buffer.dtype:
+            self.buffer = self.buffer.astype(promoted)
+
+    def accepts(self, values) -> bool:
+        if not isinstance(values, np.ndarray) or values.dtype.kind not in 'iufbmM':
+            return False
+        # Datetimes only mix with datetimes of the same unit
+        if values.dtype.kind in 'mM' or self.buffer.dtype.kind in 'mM':
+            return values.dtype == self.buffer.dtype
+        return True
+
+    def append(self, values: np.ndarray):
+        self._promote(values.dtype)
+        self._reserve(len(values))
+        self.buffer[self.size:self.size + len(values)] = values
+        self.size += len(values)
+
+    def pad(self, count: int):
+        """Append `count` missing values"""
+        kind = self.buffer.dtype.kind
+        if kind in 'iub':
+            self._promote(np.dtype('float64'))
+        self._reserve(count)
+        self.buffer[self.size:self.size + count] = np.datetime64('NaT') if kind in 'mM' else np.nan
+        self.size += count
+
+    def materialize(self):
+        # A view, not a copy; the spare capacity goes unused
+        return self.buffer[:self.size]
+
+
+class _CategoricalColumn:
+    """Categorical codes in a growable buffer, for frames encoded with one append-only dtype"""
+
+    def __init__(self, dtype: pd.CategoricalDtype, size: int = 0, capacity: int = INITIAL_CAPACITY):
+        self.dtype = dtype
+        self.codes = _BufferColumn(np.dtype('int32'), capacity=capacity)
+        if size:
+            self.pad(size)
+
+    def accepts(self, values) -> bool:
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            return False
+        # Categories only ever grow at the end, so existing codes stay valid under the newer dtype
+        old, new = self.dtype.categories, values.dtype.categories
+        return len(new) >= len(old) and new[:len(old)].equals(old)
+
+    def append(self, values: pd.Categorical):
+        self.dtype = values.dtype
+        self.codes.append(values.codes.astype('int32', copy=False))
+
+    def pad(self, count: int):
+        self.codes.append(np.full(count, -1, dtype='int32'))
+
+    def materialize(self):
+        return pd.Categorical.from_codes(self.codes.materialize(), dtype=self.dtype)
+
+
+class _ChunkedColumn:
+    """Per-day arrays joined once at the end, for dtypes without a fixed-width buffer"""
+
+    def __init__(self, size: int = 0):
+        self.chunks: List = []
+        if size:
+            self.pad(size)
+
+    def accepts(self, values) -> bool:
+        return True
+
+    def append(self, values):
+        self.chunks.append(values)
+
+    def pad(self, count: int):
+        self.chunks.append(pd.array([pd.NA] * count) if not self.chunks else
+                           pd.Series([None] * count, dtype=self.chunks[-1].dtype).array)
+
+    def materialize(self):
+        return pd.concat([pd.Series(chunk, copy=False) for chunk in self.chunks], ignore_index=True).array
+
+
+def _new_column(values, size: int, capacity: int):
+    """Pick the column type for the first values seen, padding for the `size` rows before them"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iufbmM':
+        return _BufferColumn(values.dtype, size, capacity)
+    if isinstance(values, pd.Categorical):
+        return _CategoricalColumn(values.dtype, size, capacity)
+    return _ChunkedColumn(size)
+
+
+def _column_values(series: pd.Series):
+    """The column's values as a numpy array for numpy dtypes, else its pandas array"""
+    if isinstance(series.dtype, np.dtype):
+        return series.to_numpy()
+    return series.array
+
+
+class FrameAccumulator:
+    """Append per-day frames column by column, then build one DataFrame"""
+
+    def __init__(self, expected_frames: int = None):
+        """
+        Initialize the accumulator.
+
+        Args:
+            expected_frames: Number of frames that will be appended, if known. The
+                buffers are then sized from the first frame so they rarely need to grow.
+        """
+        self.expected_frames = expected_frames
+        self.columns: Dict[str, object] = {}
+        self.rows = 0
+        self.frames = 0
+
+    def append(self, df: pd.DataFrame):
+        """Copy a frame's columns into the buffers; the frame can be dropped afterwards"""
+        if df is None or df.empty:
+            return
+
+        count = len(df)
+        # Daily reports have about the same number of rows, so the first one sizes the buffers
+        capacity = int(count * self.expected_frames * 1.1) if self.expected_frames else INITIAL_CAPACITY
+        for col in df.columns:
+            values = _column_values(df[col])
+            column = self.columns.get(col)
+            if column is None:
+                self.columns[col] = column = _new_column(values, self.rows, capacity)
+            elif not column.accepts(values):
+                # The dtype changed between days; keep the column as plain chunks from now on
+                logger.debug(f"Column {col} changed dtype, switching to chunked storage")
+                chunked = _ChunkedColumn()
+                chunked.append(pd.Series(column.materialize(), copy=False).array)
+                self.columns[col] = column = chunked
+            column.append(values)
+
+        for col, column in self.columns.items():
+            if col not in df.columns:
+                column.pad(count)
+
+        self.rows += count
+        self.frames += 1
+
+    def to_frame(self) -> pd.DataFrame:
+        """Build the combined DataFrame from the buffers"""
+        if not self.columns:
+            return pd.DataFrame()
+        return pd.DataFrame({col: column.materialize() for col, column in self.columns.items()}, copy=False)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Parsed Frame Cache
+------------------
+Stores the normalized DataFrame produced for each daily CSV in a binary
+format so later runs can skip parsing entirely. Entries are keyed by a hash
+of the raw CSV content and the version of the processing logic, so a
+re-issued file or a change to the processing code never returns a stale frame.
+
+Usage:
+    python frame_cache.py clear --cache-dir us_covid_data/parsed
+"""
+
+import argparse
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+# Feather is much faster than pickle but needs pyarrow
+from csv_schema import PYARROW_AVAILABLE
+from raw_store import open_raw
+
+logger = logging.getLogger("us_covid_fetcher.frame_cache")
+
+CACHE_SUBDIR = "parsed"
+
+
+def content_hash(raw_content: str) -> str:
+    """SHA-256 hex digest of raw CSV content"""
+    return hashlib.sha256(raw_content.encode('utf-8')).hexdigest()
+
+
+def file_hash(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a (possibly compressed) file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open_raw(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FrameCache:
+    """Content-addressed cache of processed daily DataFrames"""
+
+    def __init__(self, cache_dir: Path, version: int):
+        """
+        Initialize the frame cache.
+
+        Args:
+            cache_dir: Directory holding the cached frames
+            version: Version of the processing logic; bumping it invalidates every entry
+        """
+        self.cache_dir = cache_dir
+        self.version = version
+        self.suffix = ".feather" if PYARROW_AVAILABLE else ".pkl"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def make_key(self, raw_content: str) -> str:
+        """Build the cache key from the raw CSV content and the processing version"""
+        return self.key_for_hash(content_hash(raw_content))
+
+    def key_for_hash(self, digest: str) -> str:
+        """Build the cache key from an already computed content hash"""
+        return f"v{self.version}_{digest[:16]}"
+
+    def _path(self, date_str: str, key: str) -> Path:
+        return self.cache_dir / f"{date_str.replace('-', '_')}_{key}{self.suffix}"
+
+    def contains(self, date_str: str, key: str) -> bool:
+        """Whether a frame is cached for the date and key, without reading it"""
+        return self._path(date_str, key).exists()
+
+    def load(self, date_str: str, key: str) -> Optional[pd.DataFrame]:
+        """Return the cached frame for the date and key, or None on a miss"""
+        path = self._path(date_str, key)
+        if not path.exists():
+            return None
+
+        try:
+            if self.suffix == ".feather":
+                return pd.read_feather(path)
+            return pd.read_pickle(path)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def store(self, date_str: str, key: str, df: pd.DataFrame):
+        """Cache a processed frame, replacing any older entry for the same date"""
+        path = self._path(date_str, key)
+
+        # Drop entries for this date built from older content or processing logic
+        for old_path in self.cache_dir.glob(f"{date_str.replace('-', '_')}_*"):
+            if old_path != path:
+                old_path.unlink(missing_ok=True)
+
+        try:
+            tmp_path = path.with_suffix('.tmp')
+            if self.suffix == ".feather":
+                df.reset_index(drop=True).to_feather(tmp_path)
+            else:
+                df.to_pickle(tmp_path)
+            tmp_path.replace(path)
+        except Exception as e:
+            logger.warning(f"Failed to cache parsed frame for {date_str}: {e}")
+
+    def clear(self) -> int:
+        """Delete every cached frame and return the number of files removed"""
+        removed = 0
+        for path in self.cache_dir.iterdir():
+            if path.is_file():
+                path.unlink()
+                removed += 1
+
+        logger.info(f"Removed {removed} cached frames from {self.cache_dir}")
+        return removed
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Manage the parsed-frame cache")
+    parser.add_argument('command', choices=['clear'], help="Cache operation to run")
+    parser.add_argument('--cache-dir', type=Path, default=Path("us_covid_data") / CACHE_SUBDIR,
+                        help="Directory holding the cached frames")
+    args = parser.parse_args()
+
+    if args.command == 'clear':
+        if not args.cache_dir.exists():
+            print(f"No cache at {args.cache_dir}")
+            return
+        removed = FrameCache(args.cache_dir, version=0).clear()
+        print(f"Removed {removed} cached frames from {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""
+Frame Memory Budget
+-------------------
+Downcasting of the numeric columns of processed daily frames to the narrowest
+type that holds their values, plus bookkeeping of the bytes saved and of the
+process's peak RSS, so long (multi-year, global) runs fit on small workers.
+
+Each column always gets the same target type whatever the day, so the
+per-day frames still concatenate without being upcast again:
+
+- whole-number columns (counts, FIPS, UID) become int32, or nullable Int32
+  where the column still has gaps;
+- every other float column becomes float32 (about 7 significant digits,
+  plenty for rates and coordinates).
+
+A column whose values do not fit its target keeps its original type.
+"""
+
+import logging
+import sys
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from csv_schema import COLUMN_RENAMES, WHOLE_NUMBER_COLUMNS
+
+# Peak RSS comes from getrusage, which only exists on POSIX systems
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+logger = logging.getLogger("us_covid_fetcher.memory")
+
+INT32_RANGE = (np.iinfo(np.int32).min, np.iinfo(np.int32).max)
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+_WHOLE_NUMBER_NAMES = set(WHOLE_NUMBER_COLUMNS) | {COLUMN_RENAMES.get(col, col) for col in WHOLE_NUMBER_COLUMNS}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (0.0 where it cannot be measured)"""
+    if not RESOURCE_AVAILABLE:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def _fits_int32(values: np.ndarray) -> bool:
+    finite = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+    if finite.size == 0:
+        return True
+    if values.dtype.kind == 'f' and not np.array_equal(finite, np.floor(finite)):
+        return False
+    return INT32_RANGE[0] <= finite.min() and finite.max() <= INT32_RANGE[1]
+
+
+def downcast_column(series: pd.Series) -> pd.Series:
+    """Return the column in its narrowest safe type, or unchanged if there is none"""
+    if series.dtype.kind not in 'if':
+        return series
+    # Nullable (masked) columns, such as Int32 ones read back from the combined store, as NaN-filled floats
+    values = series.to_numpy(dtype='float64', na_value=np.nan) if series.hasnans else series.to_numpy()
+
+    if series.name in _WHOLE_NUMBER_NAMES or series.dtype.kind == 'i':
+        if not _fits_int32(values):
+            return series
+        target = 'Int32' if series.hasnans else 'int32'
+        return series if series.dtype == target else series.astype(target)
+
+    if np.nanmax(np.abs(values), initial=0.0) <= FLOAT32_MAX:
+        return series.astype('float32')
+    return series
+
+
+def downcast_frame(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Tuple[int, int]]]:
+    """
+    Downcast every numeric column of a frame, in place.
+
+    Returns:
+        The frame and, for each column that changed, its size in bytes before and after
+    """
+    savings = {}
+    for col in df.columns:
+        before = df[col]
+        after = downcast_column(before)
+        if after is not before:
+            df[col] = after
+            savings[col] = (before.memory_usage(index=False), after.memory_usage(index=False))
+    return df, savings
+
+
+class MemoryReport:
+    """Thread-safe totals of the bytes saved per column over a run"""
+
+    def __init__(self, budget_mb: float = None):
+        self.budget_mb = budget_mb
+        self.lock = threading.Lock()
+        self.columns: Dict[str, list] = {}
+
+    def add(self, savings: Dict[str, Tuple[int, int]]):
+        with self.lock:
+            for col, (before, after) in savings.items():
+                totals = self.columns.setdefault(col, [0, 0])
+                totals[0] += before
+                totals[1] += after
+
+    def log(self):
+        """Log the savings per column and the peak RSS against the budget"""
+        with self.lock:
+            columns = dict(self.columns)
+
+        before = sum(b for b, _ in columns.values())
+        after = sum(a for _, a in columns.values())
+        for col, (b, a) in sorted(columns.items(), key=lambda item: item[1][1] - item[1][0]):
+            logger.info(f"  {col}: {b / 1e6:.2f} MB -> {a / 1e6:.2f} MB")
+        logger.info(f"Downcasting saved {(before - after) / 1e6:.2f} MB ({before / 1e6:.2f} MB -> {after / 1e6:.2f} MB)")
+
+        peak = peak_rss_mb()
+        if self.budget_mb and peak > self.budget_mb:
+            logger.warning(f"Peak RSS {peak:.0f} MB is over the memory budget of {self.budget_mb:.0f} MB")
+        else:
+            logger.info(f"Peak RSS {peak:.0f} MB" + (f" (budget {self.budget_mb:.0f} MB)" if self.budget_mb else ""))
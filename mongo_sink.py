@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+"""
+MongoDB Sink
+------------
+Writes the normalized daily frames to a MongoDB collection, one document per
+report row, keyed by (Country_Region, Province_State, Admin2, Report_Date).
+
+Rows go out in batches of configurable size: bulk UpdateOne(upsert=True)
+operations by default, so re-written rows overwrite their documents instead of
+duplicating them, or plain insert_many for a first load into an empty
+collection. write_day always inserts, since it deletes the day first. The compound indexes are created on first use, and every write is
+timed so the sink can report its throughput.
+
+Writing a day first deletes the documents it had, so rows and fields missing
+from a re-fetched day do not linger. A day already ingested from the same raw
+content and processing version is skipped, as in the SQLite time series store.
+
+Configuration comes from the environment:
+    COVID_MONGO_URI         connection string (default mongodb://localhost:27017)
+    COVID_MONGO_DB          database name (default covid)
+    COVID_MONGO_COLLECTION  collection name (default daily_reports)
+    COVID_MONGO_BATCH_SIZE  documents per batch (default 1000)
+
+Usage:
+    python mongo_sink.py benchmark --data-dir us_covid_data --mock
+    python mongo_sink.py benchmark --data-dir us_covid_data --batch-size 500 --batch-size 5000
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+# pymongo is only needed when the sink is used; mongomock stands in for a server in benchmarks
+try:
+    from pymongo import ASCENDING, MongoClient, UpdateOne
+    from pymongo.errors import BulkWriteError
+    PYMONGO_AVAILABLE = True
+except ImportError:
+    PYMONGO_AVAILABLE = False
+
+try:
+    import mongomock
+    MONGOMOCK_AVAILABLE = True
+except ImportError:
+    MONGOMOCK_AVAILABLE = False
+
+logger = logging.getLogger("us_covid_fetcher.mongo")
+
+DEFAULT_MONGO_URI = os.environ.get("COVID_MONGO_URI", "mongodb://localhost:27017")
+DEFAULT_MONGO_DB = os.environ.get("COVID_MONGO_DB", "covid")
+DEFAULT_MONGO_COLLECTION = os.environ.get("COVID_MONGO_COLLECTION", "daily_reports")
+DEFAULT_BATCH_SIZE = int(os.environ.get("COVID_MONGO_BATCH_SIZE", "1000"))
+
+# Country is part of the key so global rows without a state never collide
+KEY_FIELDS = ['Country_Region', 'Province_State', 'Admin2', 'Report_Date']
+INGESTED_DAYS_COLLECTION = "ingested_days"
+DUPLICATE_KEY_ERROR = 11000
+
+
+def mongo_client(uri: str = None):
+    """MongoClient for the configured URI; the credentials belong in COVID_MONGO_URI, not in code"""
+    if not PYMONGO_AVAILABLE:
+        raise ValueError("The MongoDB sink requires the 'pymongo' package")
+    return MongoClient(uri or DEFAULT_MONGO_URI)
+
+
+def frame_documents(df: pd.DataFrame) -> List[Dict]:
+    """One document per row, missing values left out and key fields always present"""
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if series.dtype.kind == 'M':
+            values = series.dt.to_pydatetime().tolist()
+        else:
+            values = series.tolist()
+        columns[col] = values
+
+    documents = []
+    for i in range(len(df)):
+        document = {col: values[i] for col, values in columns.items() if not pd.isna(values[i])}
+        for field in KEY_FIELDS:
+            # A blank key part must compare equal from run to run
+            document.setdefault(field, '')
+        documents.append(document)
+    return documents
+
+
+class MongoSink:
+    """Batched, timed writes of daily frames to one collection"""
+
+    def __init__(self, collection, batch_size: int = DEFAULT_BATCH_SIZE, upsert: bool = True, version: int = None):
+        """
+        Initialize the sink.
+
+        Args:
+            collection: pymongo (or mongomock) collection the rows are written to
+            batch_size: Documents sent per insert_many / bulk_write call
+            upsert: Write with UpdateOne(upsert=True) keyed by KEY_FIELDS; with False,
+                rows are appended with insert_many, which only suits an empty collection
+            version: Version of the processing logic that produced the rows; a day
+                ingested under another version is rewritten even if its content is unchanged
+        """
+        self.collection = collection
+        self.days = collection.database[INGESTED_DAYS_COLLECTION]
+        self.batch_size = max(1, batch_size)
+        self.upsert = upsert
+        self.version = version
+        self.lock = threading.Lock()
+        self.indexes_ready = False
+        self.documents = 0
+        self.seconds = 0.0
+
+    @classmethod
+    def from_env(cls, client=None, upsert: bool = True, version: int = None) -> 'MongoSink':
+        """Sink configured from the COVID_MONGO_* variables, on `client` if one is given"""
+        client = client if client is not None else mongo_client()
+        return cls(client[DEFAULT_MONGO_DB][DEFAULT_MONGO_COLLECTION], DEFAULT_BATCH_SIZE, upsert, version)
+
+    def _ensure_indexes(self):
+        with self.lock:
+            if self.indexes_ready:
+                return
+            self.collection.create_index([(field, ASCENDING) for field in KEY_FIELDS], unique=True, name='row_key')
+            self.collection.create_index([('Province_State', ASCENDING), ('Report_Date', ASCENDING)], name='state_date')
+            self.indexes_ready = True
+
+    def write_frame(self, df: pd.DataFrame, upsert: bool = None) -> int:
+        """
+        Write every row of a frame in batches.
+
+        Args:
+            df: Rows to write
+            upsert: Upsert by KEY_FIELDS rather than insert (defaults to the sink's mode)
+
+        Returns:
+            Number of documents written
+        """
+        upsert = self.upsert if upsert is None else upsert
+        self._ensure_indexes()
+        documents = frame_documents(df)
+        started = time.perf_counter()
+
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start:start + self.batch_size]
+            if upsert:
+                requests = [
+                    UpdateOne({field: doc[field] for field in KEY_FIELDS}, {'$set': doc}, upsert=True)
+                    for doc in batch
+                ]
+                self.collection.bulk_write(requests, ordered=False)
+                continue
+            try:
+                self.collection.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                # Unordered, so only the rows repeating a key already written are left out
+                errors = e.details.get('writeErrors', [])
+                if any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+                    raise
+                logger.warning(f"Skipped {len(errors)} rows repeating the key of another row")
+
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.documents += len(documents)
+            self.seconds += elapsed
+        return len(documents)
+
+    def _day_key(self, content_hash: Optional[str]) -> Optional[str]:
+        """What ingested_days records for a day: the content hash, prefixed by the processing version"""
+        if content_hash is None or self.version is None:
+            return content_hash
+        return f"v{self.version}_{content_hash}"
+
+    def missing_days(self, content_hashes: Dict[str, str]) -> List[str]:
+        """
+        Days not ingested from the given content under this processing version.
+
+        Args:
+            content_hashes: Raw content hash of each day (MM-DD-YYYY)
+        """
+        stored = {
+            doc['_id']: doc.get('content_hash')
+            for doc in self.days.find({'_id': {'$in': list(content_hashes)}}, {'content_hash': 1})
+        }
+        return [date_str for date_str, digest in content_hashes.items() if stored.get(date_str) != self._day_key(digest)]
+
+    def write_day(self, date_str: str, df: pd.DataFrame, content_hash: str = None) -> bool:
+        """
+        Replace one report date, unless its content was already ingested.
+
+        Args:
+            date_str: Date in format MM-DD-YYYY
+            df: Processed frame of that day
+            content_hash: Hash of the raw content the frame came from; the write is
+                skipped when the day was ingested with the same hash and processing version
+
+        Returns:
+            True if the day was written
+        """
+        content_hash = self._day_key(content_hash)
+        if content_hash is not None:
+            stored = self.days.find_one({'_id': date_str})
+            if stored is not None and stored.get('content_hash') == content_hash:
+                return False
+
+        # Rows written with the date's Report_Date, as process_csv_data sets it
+        self.collection.delete_many({'Report_Date': pd.to_datetime(date_str, format='%m-%d-%Y').to_pydatetime()})
+        # With the day's documents gone, plain inserts need no per-row key lookups
+        count = self.write_frame(df, upsert=False)
+        self.days.replace_one({'_id': date_str}, {'content_hash': content_hash, 'row_count': count}, upsert=True)
+        return True
+
+    def throughput(self) -> Dict[str, float]:
+        """Documents written, seconds spent writing and documents per second"""
+        with self.lock:
+            documents, seconds = self.documents, self.seconds
+        return {'documents': documents, 'seconds': round(seconds, 3),
+                'docs_per_s': round(documents / seconds, 1) if seconds else 0.0}
+
+    def log(self):
+        stats = self.throughput()
+        logger.info(f"MongoDB: wrote {stats['documents']} documents in {stats['seconds']:.2f}s "
+                    f"({stats['docs_per_s']:.0f} docs/s, batches of {self.batch_size})")
+
+
+def benchmark(data_dir: Path, client, batch_sizes: List[int]) -> List[Dict]:
+    """Time insert_many and upserts of every cached daily CSV at each batch size"""
+    from ai_assist2 import USCovidFetcher
+    from parse_benchmark import corpus_files
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fetcher = USCovidFetcher(data_dir=Path(tmp) / "data", graph_dir=Path(tmp) / "graphs",
+                                 use_frame_cache=False, use_manifest=False, use_store=False)
+        frames = [fetcher.process_csv_data(path, date_str) for path, date_str in corpus_files(data_dir)]
+    frames = [df for df in frames if not df.empty]
+
+    results = []
+    for batch_size in batch_sizes:
+        for upsert in (False, True):
+            collection = client['covid_benchmark']['daily_reports']
+            collection.drop()
+            sink = MongoSink(collection, batch_size, upsert)
+            for df in frames:
+                sink.write_frame(df)
+            results.append({'mode': 'upsert' if upsert else 'insert', 'batch_size': batch_size, **sink.throughput()})
+        client.drop_database('covid_benchmark')
+    return results
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark MongoDB ingest of the daily frames")
+    parser.add_argument('command', choices=['benchmark'], help="Operation to run")
+    parser.add_argument('--data-dir', type=Path, default=Path("us_covid_data"), help="Directory of cached daily CSVs")
+    parser.add_argument('--batch-size', type=int, action='append', dest='batch_sizes',
+                        help="Documents per batch (repeatable)")
+    parser.add_argument('--mock', action='store_true', help="Write to an in-memory mongomock server")
+    args = parser.parse_args()
+
+    logging.getLogger("us_covid_fetcher").setLevel(logging.WARNING)
+    if args.mock:
+        if not MONGOMOCK_AVAILABLE:
+            parser.error("--mock requires the 'mongomock' package")
+        client = mongomock.MongoClient()
+    else:
+        client = mongo_client()
+
+    print(f"\n{'mode':>8} {'batch':>7} {'docs':>8} {'seconds':>9} {'docs/s':>10}")
+    for r in benchmark(args.data_dir, client, args.batch_sizes or [DEFAULT_BATCH_SIZE]):
+        print(f"{r['mode']:>8} {r['batch_size']:>7} {r['documents']:>8} {r['seconds']:>9.2f} {r['docs_per_s']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
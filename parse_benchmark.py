@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+US COVID-19 Parse Benchmark
+---------------------------
+Micro-benchmark of the per-day parse and normalization cost over the cached
+daily CSV corpus. The original column-by-column processing is kept here as
+the "before" reference and timed against USCovidFetcher.process_csv_data
+with each available parse engine. Every engine must return exactly the frames
+of the pandas C engine, and the legacy path the same columns and values once
+the unreported counts it zero-fills are filled too; the mismatch column counts
+the files where they do not. With --workers, the
+process-pool parse path is also timed at each worker count and its combined
+frame compared with the serial one.
+
+Usage:
+    python parse_benchmark.py --data-dir us_covid_data --workers 1 2 4 8
+"""
+
+import argparse
+import logging
+import re
+import tempfile
+import time
+from pathlib import Path
+from statistics import median
+from typing import Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from ai_assist2 import USCovidFetcher
+from csv_schema import PYARROW_AVAILABLE, UNFILLED_COLUMNS
+from daily_parse import parse_in_processes
+from schema_registry import SchemaRegistry, read_header
+
+logger = logging.getLogger("us_covid_fetcher.benchmark")
+
+FILE_DATE_PATTERN = re.compile(r'us_covid_(\d{2})_(\d{2})_(\d{4})\.csv')
+
+
+def legacy_process(path: Path, date_str: str) -> pd.DataFrame:
+    """The original process_csv_data: inferred dtypes and one fillna copy per column"""
+    df = pd.read_csv(path)
+
+    for col in df.columns:
+        if df[col].isnull().any():
+            if pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].fillna(0)
+            else:
+                df[col] = df[col].fillna('')
+
+    df = df.rename(columns={
+        'Case-Fatality_Ratio': 'Case_Fatality_Ratio',
+        'Incident_Rate': 'Incidence_Rate',
+        'Last Update': 'Last_Update'
+    })
+    df['Last_Update'] = pd.to_datetime(df['Last_Update'])
+    df['Report_Date'] = pd.to_datetime(date_str, format='%m-%d-%Y')
+    return df
+
+
+def corpus_files(data_dir: Path) -> List[Tuple[Path, str]]:
+    """Return (path, MM-DD-YYYY) for every plain daily CSV in the directory"""
+    files = []
+    for path in sorted(data_dir.glob("us_covid_*.csv")):
+        match = FILE_DATE_PATTERN.fullmatch(path.name)
+        if match:
+            month, day, year = match.groups()
+            files.append((path, f"{month}-{day}-{year}"))
+    return files
+
+
+def time_parser(parse: Callable[[Path, str], pd.DataFrame], files: List[Tuple[Path, str]]) -> Dict[str, float]:
+    """Time a parse function over every file and summarize the per-day cost in ms"""
+    timings = []
+    for path, date_str in files:
+        started = time.perf_counter()
+        parse(path, date_str)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'total_s': sum(timings) / 1000,
+        'median_ms': median(timings),
+        'max_ms': max(timings),
+    }
+
+
+def frames_match(expected: pd.DataFrame, actual: pd.DataFrame, exact: bool = True) -> bool:
+    """Whether two frames hold the same columns, in the same order, with the same values"""
+    try:
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=exact, check_exact=exact)
+    except AssertionError:
+        return False
+    return True
+
+
+def zero_filled(parse: Callable[[Path, str], pd.DataFrame]) -> Callable[[Path, str], pd.DataFrame]:
+    """Wrap a parse function so the gaps it keeps in UNFILLED_COLUMNS come out as 0, like the legacy path"""
+    def parse_filled(path: Path, date_str: str) -> pd.DataFrame:
+        df = parse(path, date_str)
+        for col in UNFILLED_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].fillna(0)
+        return df
+    return parse_filled
+
+
+def count_mismatches(reference: Callable[[Path, str], pd.DataFrame], parse: Callable[[Path, str], pd.DataFrame],
+                     files: List[Tuple[Path, str]], exact: bool = True) -> int:
+    """
+    Number of files for which two parse functions return different frames.
+
+    Args:
+        exact: Require identical dtypes and bit-identical values; otherwise the
+            column names, their order and the values (to float rounding) must agree
+    """
+    return sum(
+        not frames_match(reference(path, date_str), parse(path, date_str), exact)
+        for path, date_str in files
+    )
+
+
+def parsers(scratch_dir: Path) -> Dict[str, Callable[[Path, str], pd.DataFrame]]:
+    """Parse functions to compare, keyed by label"""
+    engines = ['c'] + (['pyarrow'] if PYARROW_AVAILABLE else [])
+    result = {'legacy': legacy_process}
+    for engine in engines:
+        fetcher = USCovidFetcher(data_dir=scratch_dir / "data", graph_dir=scratch_dir / "graphs",
+                                 use_frame_cache=False, use_manifest=False, parse_engine=engine)
+        result[engine] = fetcher.process_csv_data
+    return result
+
+
+def scaling(files: List[Tuple[Path, str]], worker_counts: List[int], engine: str = 'auto') -> List[Dict]:
+    """
+    Time the process-pool parse of every file at each worker count.
+
+    Returns:
+        One dict per worker count with wall time, speedup over one worker and
+        whether the combined frame matches the in-process serial parse
+    """
+    registry = SchemaRegistry()
+    tasks = [(path, date_str, engine, registry.plan_for(read_header(path))) for path, date_str in files]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serial = parsers(Path(tmp))['c']
+        reference = pd.concat([serial(path, date_str) for path, date_str in files], ignore_index=True)
+
+    results = []
+    for workers in sorted(set([1] + worker_counts)):
+        started = time.perf_counter()
+        frames = [df for df, _, _ in parse_in_processes(tasks, workers) if df is not None]
+        combined = pd.concat(frames, ignore_index=True)
+        elapsed = time.perf_counter() - started
+        results.append({
+            'workers': workers,
+            'wall_s': elapsed,
+            'speedup': results[0]['wall_s'] / elapsed if results else 1.0,
+            'identical': combined.equals(reference),
+        })
+    return results
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark per-day CSV parse cost")
+    parser.add_argument('--data-dir', type=Path, default=Path("us_covid_data"), help="Directory of cached daily CSVs")
+    parser.add_argument('--workers', type=int, nargs='*', default=[], help="Process-pool worker counts to compare")
+    args = parser.parse_args()
+
+    logging.getLogger("us_covid_fetcher").setLevel(logging.WARNING)
+    files = corpus_files(args.data_dir)
+    if not files:
+        print(f"No daily CSVs found in {args.data_dir}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\nParsing {len(files)} files")
+        print(f"{'parser':>10} {'total (s)':>10} {'median ms':>10} {'max ms':>8} {'mismatches':>11}")
+        candidates = parsers(Path(tmp))
+        for label, parse in candidates.items():
+            r = time_parser(parse, files)
+            # Every engine must produce exactly what the pandas C engine produces. The legacy
+            # path infers its own dtypes, parses floats without round_trip precision and
+            # zero-fills every gap, so it must match in columns and values up to the last
+            # digit of a float once the unreported counts are zero-filled too
+            if label == 'legacy':
+                mismatches = count_mismatches(zero_filled(candidates['c']), parse, files, exact=False)
+            else:
+                mismatches = count_mismatches(candidates['c'], parse, files)
+            print(f"{label:>10} {r['total_s']:>10.2f} {r['median_ms']:>10.2f} {r['max_ms']:>8.2f} {mismatches:>11}")
+
+    if args.workers:
+        print(f"\n{'workers':>8} {'wall (s)':>9} {'speedup':>8} {'identical':>10}")
+        for r in scaling(files, args.workers):
+            print(f"{r['workers']:>8} {r['wall_s']:>9.2f} {r['speedup']:>7.1f}x {str(r['identical']):>10}")
+
+
+if __name__ == "__main__":
+    main()
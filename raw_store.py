@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""
+Raw CSV Store
+-------------
+Helpers for keeping the raw daily CSV files optionally compressed on disk.
+A cached day may be stored as plain `.csv`, gzip `.csv.gz` or zstd `.csv.zst`;
+readers look for any of them and decompress transparently.
+
+Usage:
+    python raw_store.py compress --data-dir us_covid_data --compression zstd --workers 8
+    python raw_store.py benchmark --data-dir us_covid_data
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# zstd gives better ratios and much faster decompression than gzip, but is optional
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger("us_covid_fetcher.raw_store")
+
+# Compression name -> suffix appended to the .csv file name
+COMPRESSION_SUFFIXES = {
+    None: '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+# Daily raw files only, never the combined outputs
+DAILY_FILE_PATTERN = re.compile(r'^(us_)?covid_\d{2}_\d{2}_\d{4}\.csv$')
+
+
+def check_compression(compression: Optional[str]):
+    """Raise ValueError for an unknown or unavailable compression"""
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported compression: {compression}. Use one of {list(COMPRESSION_SUFFIXES)}")
+    if compression == 'zstd' and not ZSTD_AVAILABLE:
+        raise ValueError("zstd compression requires the 'zstandard' package")
+
+
+def compression_for(path: Path) -> Optional[str]:
+    """Infer the compression of a raw file from its suffix"""
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if suffix and path.name.endswith(suffix):
+            return compression
+    return None
+
+
+def raw_path(csv_path: Path, compression: Optional[str]) -> Path:
+    """Path a plain .csv file is stored under with the given compression"""
+    return csv_path.with_name(csv_path.name + COMPRESSION_SUFFIXES[compression])
+
+
+def find_raw(csv_path: Path) -> Optional[Path]:
+    """Return the stored variant (plain or compressed) of a raw CSV, if any"""
+    for compression in COMPRESSION_SUFFIXES:
+        path = raw_path(csv_path, compression)
+        if path.exists():
+            return path
+    return None
+
+
+def remove_other_variants(csv_path: Path, keep: Path):
+    """Delete stored variants of a raw CSV other than `keep`"""
+    for compression in COMPRESSION_SUFFIXES:
+        path = raw_path(csv_path, compression)
+        if path != keep:
+            path.unlink(missing_ok=True)
+
+
+def open_raw(path: Path, mode: str = 'rb', compression: Optional[str] = 'infer'):
+    """
+    Open a raw CSV file, compressing or decompressing as needed.
+
+    Args:
+        path: File to open
+        mode: 'rb', 'wb', 'rt' or 'wt'
+        compression: None, 'gzip', 'zstd', or 'infer' to go by the file suffix
+    """
+    if compression == 'infer':
+        compression = compression_for(path)
+    encoding = 'utf-8' if 't' in mode else None
+
+    if compression == 'gzip':
+        # Level 6 is gzip's default trade-off; 9 is much slower for little gain on CSV
+        return gzip.open(path, mode, compresslevel=6, encoding=encoding)
+    if compression == 'zstd':
+        check_compression(compression)
+        return zstandard.open(path, mode, encoding=encoding)
+    return open(path, mode, encoding=encoding)
+
+
+def read_text(path: Path) -> str:
+    """Read a raw CSV (plain or compressed) as text"""
+    with open_raw(path, 'rt') as f:
+        return f.read()
+
+
+def compress_file(path: Path, compression: str) -> Tuple[int, int]:
+    """
+    Replace a plain CSV with its compressed variant.
+
+    Returns:
+        Size in bytes before and after compression
+    """
+    target = raw_path(path, compression)
+    tmp_path = target.with_name(target.name + '.part')
+
+    with open(path, 'rb') as src, open_raw(tmp_path, 'wb', compression) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_path, target)
+
+    before = path.stat().st_size
+    after = target.stat().st_size
+    path.unlink()
+    return before, after
+
+
+def compress_directory(data_dir: Path, compression: str, workers: int = None) -> Tuple[int, int, int]:
+    """
+    Compress every plain daily CSV in a directory in parallel.
+
+    Args:
+        data_dir: Directory of raw daily CSVs
+        compression: 'gzip' or 'zstd'
+        workers: Number of worker processes (defaults to the CPU count)
+
+    Returns:
+        Number of files compressed, total bytes before and after
+    """
+    check_compression(compression)
+    files = sorted(p for p in data_dir.iterdir() if DAILY_FILE_PATTERN.match(p.name))
+    if not files:
+        return 0, 0, 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        sizes = list(executor.map(compress_file, files, [compression] * len(files)))
+
+    before = sum(b for b, _ in sizes)
+    after = sum(a for _, a in sizes)
+    logger.info(f"Compressed {len(files)} files with {compression}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    return len(files), before, after
+
+
+def benchmark_reads(data_dir: Path, compressions: List[Optional[str]]) -> List[Dict]:
+    """
+    Compare disk footprint and read+parse throughput of plain and compressed raw files.
+
+    Each compression is benchmarked on a scratch copy of the plain daily CSVs in
+    data_dir, so the directory itself is left untouched.
+    """
+    files = sorted(p for p in data_dir.iterdir() if DAILY_FILE_PATTERN.match(p.name))
+    results = []
+
+    for compression in compressions:
+        with tempfile.TemporaryDirectory() as tmp:
+            copies = []
+            for path in files:
+                target = raw_path(Path(tmp) / path.name, compression)
+                with open(path, 'rb') as src, open_raw(target, 'wb', compression) as dst:
+                    shutil.copyfileobj(src, dst)
+                copies.append(target)
+
+            disk_bytes = sum(p.stat().st_size for p in copies)
+            raw_bytes = sum(p.stat().st_size for p in files)
+
+            started = time.perf_counter()
+            for path in copies:
+                with open_raw(path, 'rb') as f:
+                    pd.read_csv(f)
+            elapsed = time.perf_counter() - started
+
+            results.append({
+                'compression': compression or 'none',
+                'disk_mb': disk_bytes / 1e6,
+                'ratio': raw_bytes / disk_bytes if disk_bytes else 0.0,
+                'files_per_s': len(copies) / elapsed,
+                'mb_per_s': raw_bytes / 1e6 / elapsed,
+            })
+
+    return results
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Manage the raw daily CSV cache")
+    parser.add_argument('command', choices=['compress', 'benchmark'], help="Operation to run")
+    parser.add_argument('--data-dir', type=Path, default=Path("us_covid_data"), help="Directory of raw daily CSVs")
+    parser.add_argument('--compression', choices=['gzip', 'zstd'], default='zstd' if ZSTD_AVAILABLE else 'gzip',
+                        help="Compression used by the compress command")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes for the compress command")
+    args = parser.parse_args()
+
+    if args.command == 'compress':
+        count, before, after = compress_directory(args.data_dir, args.compression, args.workers)
+        if count:
+            print(f"Compressed {count} files: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+        else:
+            print(f"No plain daily CSVs found in {args.data_dir}")
+
+    elif args.command == 'benchmark':
+        compressions = [None, 'gzip'] + (['zstd'] if ZSTD_AVAILABLE else [])
+        print(f"\n{'format':>8} {'disk MB':>9} {'ratio':>7} {'files/s':>9} {'MB/s':>8}")
+        for r in benchmark_reads(args.data_dir, compressions):
+            print(f"{r['compression']:>8} {r['disk_mb']:>9.2f} {r['ratio']:>6.1f}x {r['files_per_s']:>9.1f} {r['mb_per_s']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Raw CSV Validation
+------------------
+Cheap check that a cached or downloaded daily report really is one, run before
+the full parse. Only the first few hundred bytes are read: the header line is
+looked up by its fingerprint in the schema registry (or resolved against the
+known column names for a new layout) and must contain the required columns.
+A GitHub page captured instead of the raw file ("Skip to content",
+"Navigation Menu", ...) or an empty body fails immediately.
+
+Files that fail are moved to a quarantine directory next to the data, so the
+next run fetches the date again instead of trusting the bad copy forever.
+
+Usage:
+    python raw_validation.py --data-dir covid_data
+    python raw_validation.py --data-dir us_covid_data --dry-run
+"""
+
+import argparse
+import csv
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from csv_schema import REQUIRED_COLUMNS
+from raw_store import COMPRESSION_SUFFIXES, DAILY_FILE_PATTERN, open_raw
+from schema_registry import SCHEMA_REGISTRY_FILE, SchemaRegistry, header_fingerprint
+
+logger = logging.getLogger("us_covid_fetcher.validation")
+
+# Longest real header (the US reports) is about 250 bytes
+SNIFF_BYTES = 512
+QUARANTINE_SUBDIR = "quarantine"
+
+
+def sniff_header(source: Union[str, bytes, Path], limit: int = SNIFF_BYTES) -> Optional[List[str]]:
+    """
+    Return the column names from the first `limit` bytes of a daily report.
+
+    Args:
+        source: Raw CSV content (string or bytes), or the path of a (possibly compressed) CSV file
+        limit: How much of the file to look at
+
+    Returns:
+        The header's column names, or None if no line ends within `limit`
+    """
+    if isinstance(source, Path):
+        with open_raw(source, 'rb') as f:
+            head = f.read(limit)
+    else:
+        head = source[:limit]
+    if isinstance(head, bytes):
+        # The limit may cut a multi-byte character in half
+        head = head.decode('utf-8', errors='replace')
+
+    end = head.find('\n')
+    if end < 0:
+        if len(head) >= limit:
+            return None
+        end = len(head)
+
+    line = head[:end].lstrip('\ufeff').rstrip('\r')
+    return next(csv.reader([line]), [])
+
+
+class HeaderValidator:
+    """Accepts headers that resolve to the required columns; verdicts are cached per fingerprint"""
+
+    def __init__(self, registry: SchemaRegistry):
+        """
+        Initialize the validator.
+
+        Args:
+            registry: Schema registry holding the known header layouts and column aliases
+        """
+        self.registry = registry
+        self.verdicts: Dict[str, Optional[str]] = {}
+
+    def check_header(self, columns: List[str]) -> Optional[str]:
+        """Return why a header is not a daily report's, or None if it is"""
+        key = header_fingerprint(columns)
+        if key in self.verdicts:
+            return self.verdicts[key]
+
+        plan = self.registry.plans.get(key)
+        if plan is not None:
+            names = {plan['renames'].get(col, col) for col in plan['columns']}
+        else:
+            # A new layout: only exact (alias) matches count, fuzzy matching waits for the real parse
+            names = {self.registry.aliases.get(col.strip()) for col in columns}
+
+        missing = [col for col in REQUIRED_COLUMNS if col not in names]
+        verdict = None
+        if missing:
+            first = ','.join(columns)[:40]
+            verdict = f"header {first!r} lacks {', '.join(missing)}"
+
+        self.verdicts[key] = verdict
+        return verdict
+
+    def check(self, source: Union[str, bytes, Path]) -> Optional[str]:
+        """
+        Validate raw content or a raw file by its header alone.
+
+        Returns:
+            Why the source is not a daily report, or None if it looks like one
+        """
+        columns = sniff_header(source)
+        if columns is None:
+            return f"no header line in the first {SNIFF_BYTES} bytes"
+        return self.check_header(columns)
+
+
+def quarantine(path: Path) -> Path:
+    """Move a bad raw file into the quarantine directory beside it and return its new path"""
+    target_dir = path.parent / QUARANTINE_SUBDIR
+    target_dir.mkdir(exist_ok=True)
+    # Timestamped so a date that keeps failing keeps every bad copy for inspection
+    target = target_dir / f"{path.name}.{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    os.replace(path, target)
+    logger.info(f"Moved {path.name} to {target}")
+    return target
+
+
+def daily_files(data_dir: Path) -> List[Path]:
+    """Every raw daily file in a directory, plain or compressed"""
+    files = []
+    for path in sorted(data_dir.iterdir()):
+        name = path.name
+        for suffix in COMPRESSION_SUFFIXES.values():
+            if suffix and name.endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+        if path.is_file() and DAILY_FILE_PATTERN.match(name):
+            files.append(path)
+    return files
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Quarantine cached daily files that are not CSV daily reports")
+    parser.add_argument('--data-dir', type=Path, default=Path("us_covid_data"), help="Directory of raw daily CSVs")
+    parser.add_argument('--dry-run', action='store_true', help="Only report the bad files")
+    args = parser.parse_args()
+
+    validator = HeaderValidator(SchemaRegistry(args.data_dir / SCHEMA_REGISTRY_FILE))
+    files = daily_files(args.data_dir)
+    bad = 0
+    for path in files:
+        reason = validator.check(path)
+        if reason is None:
+            continue
+        bad += 1
+        if args.dry_run:
+            print(f"{path.name}: {reason}")
+        else:
+            print(f"{path.name}: {reason}, moved to {quarantine(path)}")
+
+    print(f"{bad} of {len(files)} files failed validation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""
+Offline Replay Server
+---------------------
+Serves the cached us_covid_data corpus over HTTP using the same MM-DD-YYYY.csv
+layout as the JHU GitHub raw URL, so USCovidFetcher can be exercised and
+benchmarked on a machine without network access. Latency, transient server
+errors and missing files can be injected to mimic the real upstream.
+
+Usage:
+    python replay_server.py --port 8000 --latency-ms 80 --error-rate 0.02 --missing-rate 0.01
+    COVID_DATA_URL=http://127.0.0.1:8000/ python ai_assist2.py
+"""
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Tuple
+
+DEFAULT_CORPUS_DIR = Path("us_covid_data")
+
+
+class ReplayRequestHandler(SimpleHTTPRequestHandler):
+    """Serves us_covid_MM_DD_YYYY.csv files under the GitHub MM-DD-YYYY.csv layout"""
+
+    rng_lock = threading.Lock()
+
+    def __init__(self, *args, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 missing_rate: float = 0.0, rng: random.Random = None, **kwargs):
+        # Set before super().__init__, which handles the request immediately
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.missing_rate = missing_rate
+        self.rng = rng or random.Random(0)
+        super().__init__(*args, **kwargs)
+
+    def translate_path(self, path: str) -> str:
+        name = path.rsplit('/', 1)[-1].split('?', 1)[0]
+        return str(Path(self.directory) / f"us_covid_{name.replace('-', '_')}")
+
+    def _is_missing(self) -> bool:
+        """Pick missing files by hashing the path so the same dates are always missing"""
+        if self.missing_rate <= 0:
+            return False
+        bucket = int(hashlib.md5(self.path.encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return bucket < self.missing_rate
+
+    def _inject(self) -> bool:
+        """Apply the configured latency and faults; return True if a response was already sent"""
+        with self.rng_lock:
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            fail = self.rng.random() < self.error_rate
+
+        if delay > 0:
+            time.sleep(delay)
+
+        if fail:
+            self.send_error(503, "Injected server error")
+            return True
+
+        if self._is_missing():
+            self.send_error(404, "Injected missing file")
+            return True
+
+        return False
+
+    def do_GET(self):
+        if not self._inject():
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self._inject():
+            super().do_HEAD()
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+
+def start_replay_server(
+    corpus_dir: Path = DEFAULT_CORPUS_DIR,
+    port: int = 0,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    missing_rate: float = 0.0,
+    seed: int = 0
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the replay server in a background thread.
+
+    Args:
+        corpus_dir: Directory holding the cached daily CSV files
+        port: Port to listen on (0 picks a free one)
+        latency: Fixed delay added to every response, in seconds
+        jitter: Extra random delay of up to this many seconds
+        error_rate: Fraction of requests answered with a transient 503
+        missing_rate: Fraction of dates that always answer 404
+        seed: Seed for the fault injection, so runs are repeatable
+
+    Returns:
+        The running server and the base URL to pass to USCovidFetcher
+    """
+    handler = partial(
+        ReplayRequestHandler,
+        directory=str(corpus_dir),
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        missing_rate=missing_rate,
+        rng=random.Random(seed)
+    )
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address
+    return server, f"http://{host}:{port}/"
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Serve the cached US COVID corpus like the GitHub raw URL")
+    parser.add_argument('--corpus', type=Path, default=DEFAULT_CORPUS_DIR, help="Directory of cached daily CSVs")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Fixed latency per response")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Random extra latency per response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--missing-rate', type=float, default=0.0, help="Fraction of dates answered with 404")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for fault injection")
+    args = parser.parse_args()
+
+    server, base_url = start_replay_server(
+        args.corpus, args.port, args.latency_ms / 1000, args.jitter_ms / 1000,
+        args.error_rate, args.missing_rate, args.seed
+    )
+    print(f"Serving {args.corpus} at {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+Fetch Retry Policy
+------------------
+Retry budgets, jittered exponential backoff and a circuit breaker used by
+USCovidFetcher, plus the counters that show how often each of them kicked in.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger("us_covid_fetcher.retry")
+
+# Retries allowed per error class before a date is given up on
+DEFAULT_RETRY_BUDGETS = {
+    'timeout': 3,
+    'connection': 3,
+    'server_error': 4,
+    'rate_limited': 5,
+}
+
+
+class RetryPolicy:
+    """Decides whether and how long to wait before retrying a failed request"""
+
+    def __init__(
+        self,
+        budgets: Dict[str, int] = None,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0
+    ):
+        """
+        Initialize the retry policy.
+
+        Args:
+            budgets: Retries allowed per error class (see DEFAULT_RETRY_BUDGETS)
+            base_delay: Backoff for the first retry in seconds, doubled on each attempt
+            max_delay: Upper bound for any single wait, including Retry-After
+        """
+        self.budgets = dict(DEFAULT_RETRY_BUDGETS)
+        if budgets:
+            self.budgets.update(budgets)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def classify_exception(error: Exception) -> Optional[str]:
+        """Map a requests exception to an error class, or None if it should not be retried"""
+        if isinstance(error, requests.exceptions.Timeout):
+            return 'timeout'
+        if isinstance(error, requests.exceptions.ConnectionError):
+            return 'connection'
+        return None
+
+    @staticmethod
+    def classify_status(status_code: int) -> Optional[str]:
+        """Map an HTTP status to an error class, or None if the response is final"""
+        if status_code == 429:
+            return 'rate_limited'
+        if status_code >= 500:
+            return 'server_error'
+        return None
+
+    def next_delay(self, error_class: str, attempt: int, retry_after: str = None) -> Optional[float]:
+        """
+        Return how long to wait before the next attempt, or None once the budget is spent.
+
+        Args:
+            error_class: Error class of the failed attempt
+            attempt: Number of retries already made for this error class
+            retry_after: Value of the server's Retry-After header, if any
+        """
+        if attempt >= self.budgets.get(error_class, 0):
+            return None
+
+        server_delay = self.parse_retry_after(retry_after)
+        if server_delay is not None:
+            return min(server_delay, self.max_delay)
+
+        # "Full jitter": spread retries out so parallel workers don't retry in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def parse_retry_after(value: str) -> Optional[float]:
+        """Parse a Retry-After header given either in seconds or as an HTTP date"""
+        if not value:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker:
+    """
+    Pauses every worker when too many recent requests failed upstream.
+
+    Outcomes of the last `window` requests are kept. Once at least `min_requests`
+    have been seen and the error rate reaches `threshold`, the breaker opens and
+    callers of before_request() block for `cooldown` seconds.
+    """
+
+    def __init__(self, threshold: float = 0.5, window: int = 20, min_requests: int = 10,
+                 cooldown: float = 30.0, metrics: 'FetchMetrics' = None):
+        self.threshold = threshold
+        self.window = window
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.metrics = metrics
+        self.outcomes = deque(maxlen=window)
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+
+    def before_request(self):
+        """Block while the breaker is open"""
+        with self.lock:
+            wait_time = self.open_until - time.monotonic()
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    def record(self, success: bool):
+        """Record the outcome of one request and trip the breaker if needed"""
+        with self.lock:
+            self.outcomes.append(success)
+            if len(self.outcomes) < self.min_requests:
+                return
+
+            error_rate = self.outcomes.count(False) / len(self.outcomes)
+            if error_rate >= self.threshold and time.monotonic() >= self.open_until:
+                self.open_until = time.monotonic() + self.cooldown
+                # Start from a clean slate once the pause is over
+                self.outcomes.clear()
+                logger.warning(f"Upstream error rate {error_rate:.0%} - pausing fetches for {self.cooldown:.0f}s")
+                if self.metrics:
+                    self.metrics.increment('breaker_trips')
+
+
+class FetchMetrics:
+    """Thread-safe counters and latency samples collected while fetching"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.latencies: List[float] = []
+
+    def increment(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_latency(self, seconds: float):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """Return the counters plus latency percentiles in milliseconds"""
+        with self.lock:
+            summary = dict(sorted(self.counters.items()))
+            latencies = sorted(self.latencies)
+
+        if latencies:
+            summary['latency_p50_ms'] = round(latencies[len(latencies) // 2] * 1000, 1)
+            summary['latency_p99_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1)
+            summary['latency_max_ms'] = round(latencies[-1] * 1000, 1)
+        return summary
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+Header Schema Registry
+----------------------
+Maps every daily report header layout seen so far to a precompiled plan: which
+columns to read and what to rename them to. Layouts are keyed by a fingerprint
+of the header row, so a plan is built once per layout rather than once per
+file. Names the schema already knows are resolved exactly; an unknown name is
+fuzzy-matched against the known ones once, and the resulting plan is saved so
+later runs never have to match it again.
+
+Usage:
+    python schema_registry.py show --data-dir us_covid_data
+"""
+
+import argparse
+import csv
+import difflib
+import hashlib
+import json
+import logging
+import threading
+from io import StringIO
+from pathlib import Path
+from typing import Dict, List, Union
+
+from csv_schema import COLUMN_DTYPES, COLUMN_RENAMES
+from raw_store import open_raw
+from storage import write_json_atomic
+
+logger = logging.getLogger("us_covid_fetcher.schema_registry")
+
+SCHEMA_REGISTRY_FILE = "schema_registry.json"
+# Similarity an unknown column name needs to be taken for a known one; lower
+# values start pairing unrelated names such as Recovered/Deaths
+FUZZY_MATCH_CUTOFF = 0.8
+
+
+def read_header(source: Union[str, Path]) -> List[str]:
+    """
+    Return the column names of a daily report without parsing the rest of it.
+
+    Args:
+        source: Raw CSV content as string, or the path of a (possibly compressed) CSV file
+    """
+    if isinstance(source, Path):
+        with open_raw(source, 'rt') as f:
+            line = f.readline()
+    else:
+        line = source[:source.find('\n') + 1] if '\n' in source else source
+
+    # csv handles quoted names; the BOM some exports start with is not part of the name
+    return next(csv.reader(StringIO(line.lstrip('\ufeff'))), [])
+
+
+def header_fingerprint(columns: List[str]) -> str:
+    """Stable key for a header layout"""
+    return hashlib.sha1('\x1f'.join(columns).encode('utf-8')).hexdigest()[:16]
+
+
+def schema_hash() -> str:
+    """Key for the declared schema; saved plans built against a different one are rebuilt"""
+    schema = {'dtypes': COLUMN_DTYPES, 'renames': COLUMN_RENAMES}
+    return hashlib.sha1(json.dumps(schema, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class SchemaRegistry:
+    """
+    Header fingerprint -> {'columns': [...], 'renames': {...}} plans, optionally
+    persisted as a JSON file.
+
+    'columns' lists the header columns to read, in file order; 'renames' maps
+    the ones whose name differs from the canonical name. Saved plans and learned
+    aliases are only reused while COLUMN_DTYPES and COLUMN_RENAMES are unchanged,
+    so a column added to the schema is picked up by layouts seen before.
+    """
+
+    def __init__(self, path: Path = None):
+        """
+        Initialize the registry.
+
+        Args:
+            path: JSON file the plans are loaded from and saved to (in memory only if None)
+        """
+        self.path = path
+        self.schema_hash = schema_hash()
+        self.lock = threading.Lock()
+        self.plans: Dict[str, Dict] = {}
+        # Every known name, including the old spellings, mapped to its canonical name
+        self.aliases: Dict[str, str] = {col: COLUMN_RENAMES.get(col, col) for col in COLUMN_DTYPES}
+
+        if path and path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+                if stored.get('schema_hash') == self.schema_hash:
+                    self.plans = stored.get('plans', {})
+                    self.aliases.update({col: name for col, name in stored.get('aliases', {}).items()
+                                         if col not in COLUMN_DTYPES})
+                else:
+                    logger.info(f"Schema changed since {path} was saved; rebuilding header plans")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable schema registry {path}: {e}")
+
+    def plan_for(self, columns: List[str]) -> Dict:
+        """Return the plan for a header, building and saving it the first time the layout is seen"""
+        key = header_fingerprint(columns)
+        plan = self.plans.get(key)
+        if plan is not None:
+            return plan
+
+        with self.lock:
+            if key not in self.plans:
+                self.plans[key] = self._build_plan(columns)
+                self._save()
+            return self.plans[key]
+
+    def _build_plan(self, columns: List[str]) -> Dict:
+        """Resolve every column of a new header layout, fuzzy-matching names the schema doesn't know"""
+        canonical_names = sorted(set(self.aliases.values()))
+        read, renames = [], {}
+
+        for col in columns:
+            name = self.aliases.get(col)
+            if name is None:
+                matches = difflib.get_close_matches(col.strip(), canonical_names, n=1, cutoff=FUZZY_MATCH_CUTOFF)
+                if not matches:
+                    logger.info(f"Dropping unknown column {col!r}")
+                    continue
+                name = matches[0]
+                self.aliases[col] = name
+                logger.info(f"Matched unknown column {col!r} to {name!r}")
+
+            read.append(col)
+            if name != col:
+                renames[col] = name
+
+        logger.info(f"New header layout with {len(columns)} columns ({len(read)} kept)")
+        return {'columns': read, 'renames': renames}
+
+    def _save(self):
+        """Persist the plans and learned aliases; called with the lock held"""
+        if self.path is None:
+            return
+        learned = {col: name for col, name in self.aliases.items() if col not in COLUMN_DTYPES}
+        write_json_atomic(self.path, {'schema_hash': self.schema_hash, 'plans': self.plans, 'aliases': learned},
+                          indent=2, sort_keys=True)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Inspect the saved header layouts")
+    parser.add_argument('command', choices=['show'], help="Operation to run")
+    parser.add_argument('--data-dir', type=Path, default=Path("us_covid_data"), help="Directory holding the registry")
+    args = parser.parse_args()
+
+    registry = SchemaRegistry(args.data_dir / SCHEMA_REGISTRY_FILE)
+    for key, plan in sorted(registry.plans.items()):
+        renames = ', '.join(f"{src} -> {dst}" for src, dst in plan['renames'].items()) or 'none'
+        print(f"{key}: {len(plan['columns'])} columns, renames: {renames}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+State Series Index
+------------------
+Per-state access to the combined frame without a boolean mask per state.
+The frame is sorted once by (Province_State, Report_Date); each state then
+owns one contiguous block of rows, found by its start and stop offsets, so
+handing out a state's rows or one of its columns is a slice rather than a
+scan of every row of every day.
+
+The index is built from one frame and never updated; the fetchers rebuild it
+whenever self.data is replaced.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+class StateSeriesIndex:
+    """Contiguous, date-sorted row blocks per state of one combined frame"""
+
+    def __init__(self, data: pd.DataFrame, key: str = 'Province_State', date_column: str = 'Report_Date'):
+        """
+        Build the index.
+
+        Args:
+            data: Combined frame
+            key: Column the rows are grouped by
+            date_column: Column each group is sorted by
+        """
+        self.source = data
+        self.date_column = date_column
+        self.slices: Dict[str, slice] = {}
+
+        if data.empty or key not in data.columns:
+            self.frame = data.iloc[:0]
+            return
+
+        # Rows without a state (code -1) sort first and belong to no block
+        codes, labels = pd.factorize(data[key])
+        order = np.lexsort((data[date_column].to_numpy(), codes))
+        self.frame = data.take(order).reset_index(drop=True)
+
+        counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+        start = int((codes < 0).sum())
+        for label, count in zip(labels, counts):
+            self.slices[label] = slice(start, start + int(count))
+            start += int(count)
+
+    @property
+    def states(self) -> List[str]:
+        """Every state in the index, in order of first appearance"""
+        return list(self.slices)
+
+    def __contains__(self, state: str) -> bool:
+        return state in self.slices
+
+    def __len__(self) -> int:
+        return len(self.slices)
+
+    def rows(self, state: str) -> pd.DataFrame:
+        """A state's rows sorted by date (empty for an unknown state)"""
+        return self.frame.iloc[self.slices.get(state, slice(0, 0))]
+
+    def column(self, state: str, col: str) -> np.ndarray:
+        """One column of a state's rows as an array, in date order"""
+        return self.frame[col].iloc[self.slices.get(state, slice(0, 0))].to_numpy()
+
+    def on_date(self, report_date) -> pd.DataFrame:
+        """Every state's rows for one report date, found by binary search inside each block"""
+        dates = self.frame[self.date_column].to_numpy()
+        target = pd.Timestamp(report_date).to_datetime64().astype(dates.dtype)
+        positions = []
+        for block in self.slices.values():
+            lo = block.start + np.searchsorted(dates[block], target, side='left')
+            hi = block.start + np.searchsorted(dates[block], target, side='right')
+            positions.extend(range(lo, hi))
+        return self.frame.iloc[positions]
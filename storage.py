@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Local State Storage
+-------------------
+The two ways the fetchers keep state next to the data: JSON sidecars, which
+are replaced atomically so a crash never leaves half a file behind, and
+SQLite databases in WAL mode, which the worker threads share through one
+connection serialized by a lock.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable
+
+
+def write_json_atomic(path: Path, data, **dump_options):
+    """
+    Write data as JSON to a temp file next to path, then move it into place.
+
+    Args:
+        path: File to write; its directory is created if needed
+        data: JSON-serializable value
+        dump_options: Passed on to json.dump (indent, sort_keys, ...)
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **dump_options)
+    os.replace(tmp_path, path)
+
+
+class LockedSQLite:
+    """SQLite database whose one connection is shared by every thread, with a lock serializing access"""
+
+    def __init__(self, path: Path, schema: Iterable[str]):
+        """
+        Open or create the database.
+
+        Args:
+            path: SQLite database file
+            schema: CREATE ... IF NOT EXISTS statements run on every open
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        for statement in schema:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,65 @@
+"""
+CombinedStore: appending, replacing and reading back days, and recovering
+from a damaged stored days file.
+"""
+
+import pandas as pd
+import pytest
+
+from combined_dataset import COMBINED_FORMATS, CombinedStore
+from csv_schema import PYARROW_AVAILABLE
+
+FORMATS = [
+    pytest.param(fmt, marks=pytest.mark.skipif(fmt == 'parquet' and not PYARROW_AVAILABLE, reason="needs pyarrow"))
+    for fmt in COMBINED_FORMATS
+]
+
+
+def day(report_date: str, states=('Texas', 'Ohio'), **columns) -> pd.DataFrame:
+    """Processed frame of one report date (YYYY-MM-DD)"""
+    confirmed = [10 * (index + 1) for index in range(len(states))]
+    return pd.DataFrame({'Province_State': list(states), 'Confirmed': confirmed, 'Deaths': [1] * len(states),
+                         'Report_Date': pd.to_datetime([report_date] * len(states)), **columns})
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_unreadable_days_file_is_rebuilt_from_the_store(tmp_path, fmt):
+    store = CombinedStore(tmp_path / 'combined', fmt)
+    store.append(day('2021-01-31'), {'01-31-2021': 'a'})
+    store.append(day('2021-02-01', states=('Texas',)), {'02-01-2021': 'b'})
+    expected = store.read()
+    store.days_path.write_text('{"partition_by_state": false, "da')
+
+    reopened = CombinedStore(tmp_path / 'combined', fmt)
+    pd.testing.assert_frame_equal(reopened.read(), expected)
+    assert reopened.stored_dates() == ['01-31-2021', '02-01-2021']
+    assert reopened.days['02-01-2021'] == {'content_hash': None, 'rows': 1}
+    # The rebuilt record is saved, so the next open reads it back
+    assert CombinedStore(tmp_path / 'combined', fmt).days == reopened.days
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="needs pyarrow")
+@pytest.mark.parametrize('partition_by_state', [False, True])
+def test_refetched_day_replaces_every_state(tmp_path, partition_by_state):
+    store = CombinedStore(tmp_path / 'combined', 'parquet', partition_by_state)
+    store.append(pd.concat([day('2021-01-30', states=('Texas',)), day('2021-01-31')], ignore_index=True))
+    # Ohio is gone from the re-fetched 01-31, and no other day of the month has it
+    store.append(day('2021-01-31', states=('Texas',)))
+
+    df = store.read()
+    assert df.groupby(df['Report_Date'].dt.strftime('%m-%d'))['Province_State'].apply(list).to_dict() == {
+        '01-30': ['Texas'], '01-31': ['Texas']
+    }
+    assert store.days['01-31-2021']['rows'] == 1
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+def test_column_added_in_a_later_month_is_read(tmp_path, fmt):
+    store = CombinedStore(tmp_path / 'combined', fmt)
+    store.append(day('2021-01-31'))
+    february = day('2021-02-01', People_Hospitalized=[3.0, 4.0])
+    store.append(february)
+
+    df = store.read()
+    assert list(df.columns) == list(february.columns)
+    assert df['People_Hospitalized'].isna().tolist() == [True, True, False, False]
@@ -0,0 +1,33 @@
+"""
+Derived metrics across separately fetched ranges: the metrics table must not
+difference or average across the gap between them, so it agrees with the
+series derived from the fetched frame.
+"""
+
+import pandas as pd
+import pytest
+
+from derived_metrics import NATIONAL_SERIES
+
+RANGES = [('01-01-2021', '01-20-2021'), ('03-01-2021', '03-20-2021')]
+
+
+def fetch_ranges(make_fetcher, data_dir, use_derived_metrics):
+    """Fetch each range in turn into one data directory; return the fetcher of the last"""
+    for start_date, end_date in RANGES:
+        fetcher = make_fetcher(start_date, end_date, data_dir=data_dir, use_derived_metrics=use_derived_metrics)
+        fetcher.fetch_all_dates()
+    return fetcher
+
+
+@pytest.mark.parametrize('series', ['Texas', NATIONAL_SERIES])
+def test_disjoint_ranges_match_frame(make_fetcher, tmp_path, series):
+    from_table = fetch_ranges(make_fetcher, tmp_path / 'table', True)._metric_series(series)
+    from_frame = fetch_ranges(make_fetcher, tmp_path / 'frame', False)._metric_series(series)
+
+    pd.testing.assert_frame_equal(from_table, from_frame, check_dtype=False)
+    first_day = from_table.iloc[0]
+    assert first_day['Report_Date'] == pd.Timestamp('2021-03-01')
+    assert first_day['New_Cases'] == 0
+    assert from_table['New_Cases_7day_Avg'].iloc[:6].isna().all()
+    assert from_table['New_Cases_7day_Avg'].iloc[6:].notna().all()
@@ -0,0 +1,36 @@
+"""
+A run with a memory budget downcasts only the data it loads: the combined
+store, and the sinks later runs backfill from it, keep full precision.
+"""
+
+import sqlite3
+
+import pandas as pd
+
+from combined_dataset import read_dataset
+from timeseries_store import TIMESERIES_STORE_FILE
+
+START_DATE, END_DATE = '01-01-2021', '01-10-2021'
+
+
+def test_budget_run_keeps_store_at_full_precision(make_fetcher, tmp_path):
+    reference = make_fetcher(START_DATE, END_DATE, data_dir=tmp_path / 'reference')
+    reference.fetch_all_dates()
+
+    budget = make_fetcher(START_DATE, END_DATE, memory_budget_mb=4096)
+    budget.fetch_all_dates()
+    assert budget.data['Incidence_Rate'].dtype == 'float32'
+    pd.testing.assert_frame_equal(read_dataset(budget.combined_store.path), reference.data)
+    budget.close()
+
+    # A plain run reuses every stored day, and refills a deleted sink from the combined store
+    (tmp_path / 'data' / TIMESERIES_STORE_FILE).unlink()
+    plain = make_fetcher(START_DATE, END_DATE, use_frame_cache=False)
+    plain.fetch_all_dates()
+    pd.testing.assert_frame_equal(plain.data, reference.data)
+
+    query = 'SELECT Province_State, Report_Date, Incidence_Rate FROM daily_reports ORDER BY 1, 2'
+    with sqlite3.connect(tmp_path / 'data' / TIMESERIES_STORE_FILE) as conn:
+        backfilled = conn.execute(query).fetchall()
+    with sqlite3.connect(tmp_path / 'reference' / TIMESERIES_STORE_FILE) as conn:
+        assert backfilled == conn.execute(query).fetchall()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+Time Series Store
+-----------------
+SQLite database of the normalized daily rows, so the data outlives the loose
+raw CSVs and the per-run combined files. One row per report row, in the
+canonical columns of csv_schema, with Report_Date as YYYY-MM-DD text.
+
+The fetchers only write to it; it is read with SQL, e.g. from the sqlite3
+shell. Indexes:
+- (Province_State, Report_Date) serves per-state series;
+- (Country_Region, Admin2) serves county and country lookups in global data;
+- (Report_Date) serves replacing a day.
+
+Writes are per day and idempotent: a day's rows are replaced in one
+transaction, and a day already stored from the same raw content and
+processing version is skipped, so re-fetching or re-running never duplicates
+rows while a processing change still rewrites them.
+
+Usage:
+    python timeseries_store.py --store us_covid_data/covid_timeseries.sqlite
+    sqlite3 us_covid_data/covid_timeseries.sqlite \
+        "SELECT Report_Date, Confirmed, Deaths FROM daily_reports WHERE Province_State = 'Texas'"
+"""
+
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from csv_schema import COLUMN_DTYPES, COLUMN_RENAMES, INT_COLUMNS
+from storage import LockedSQLite
+
+TIMESERIES_STORE_FILE = "covid_timeseries.sqlite"
+
+SQL_TYPES = {'float64': 'REAL', 'str': 'TEXT'}
+
+
+def _store_columns() -> Dict[str, str]:
+    """Canonical column name -> SQLite type, in schema order"""
+    columns = {}
+    for col, dtype in COLUMN_DTYPES.items():
+        name = COLUMN_RENAMES.get(col, col)
+        columns.setdefault(name, 'INTEGER' if name in INT_COLUMNS else SQL_TYPES[dtype])
+    columns['Report_Date'] = 'TEXT NOT NULL'
+    return columns
+
+
+STORE_COLUMNS = _store_columns()
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS daily_reports ("
+    + ", ".join(f'"{col}" {sql_type}' for col, sql_type in STORE_COLUMNS.items()) + ")",
+    """CREATE TABLE IF NOT EXISTS stored_days (
+        report_date TEXT PRIMARY KEY,       -- YYYY-MM-DD
+        content_hash TEXT,
+        row_count INTEGER
+    )""",
+    'CREATE INDEX IF NOT EXISTS idx_state_date ON daily_reports ("Province_State", "Report_Date")',
+    'CREATE INDEX IF NOT EXISTS idx_country_admin2 ON daily_reports ("Country_Region", "Admin2")',
+    'CREATE INDEX IF NOT EXISTS idx_report_date ON daily_reports ("Report_Date")',
+]
+
+
+def _sql_date(value) -> str:
+    """YYYY-MM-DD for a MM-DD-YYYY string, date or timestamp"""
+    if isinstance(value, str):
+        return pd.to_datetime(value, format='%m-%d-%Y').strftime('%Y-%m-%d')
+    return value.strftime('%Y-%m-%d')
+
+
+def _sql_values(series: pd.Series) -> list:
+    """A column as values sqlite3 can bind, with every kind of missing value as None"""
+    if series.dtype.kind == 'M':
+        series = series.dt.strftime('%Y-%m-%d %H:%M:%S')
+    return [None if pd.isna(value) else value for value in series.tolist()]
+
+
+class TimeSeriesStore(LockedSQLite):
+    """Thread-safe SQLite store of normalized daily rows"""
+
+    def __init__(self, path: Path, version: int = None):
+        """
+        Open or create the store.
+
+        Args:
+            path: SQLite database file
+            version: Version of the processing logic that produced the rows; a day
+                stored under another version is rewritten even if its content is unchanged
+        """
+        super().__init__(path, SCHEMA)
+        self.version = version
+
+    def _day_key(self, content_hash: Optional[str]) -> Optional[str]:
+        """What stored_days records for a day: the content hash, prefixed by the processing version"""
+        if content_hash is None or self.version is None:
+            return content_hash
+        return f"v{self.version}_{content_hash}"
+
+    def missing_days(self, content_hashes: Dict[str, str]) -> List[str]:
+        """
+        Days not stored from the given content under this processing version.
+
+        Args:
+            content_hashes: Raw content hash of each day (MM-DD-YYYY)
+        """
+        # One row per stored day, so reading them all is cheap and needs no parameter per date
+        with self.lock:
+            stored = dict(self.conn.execute("SELECT report_date, content_hash FROM stored_days").fetchall())
+        return [date_str for date_str, digest in content_hashes.items()
+                if stored.get(_sql_date(date_str)) != self._day_key(digest)]
+
+    def write_day(self, date_str: str, df: pd.DataFrame, content_hash: str = None) -> bool:
+        """
+        Replace the rows of one report date.
+
+        Args:
+            date_str: Date in format MM-DD-YYYY
+            df: Processed frame of that day
+            content_hash: Hash of the raw content the frame came from; the write is
+                skipped when the stored day has the same hash and processing version
+
+        Returns:
+            True if the day was written
+        """
+        report_date = _sql_date(date_str)
+        content_hash = self._day_key(content_hash)
+        with self.lock:
+            if content_hash is not None:
+                row = self.conn.execute(
+                    "SELECT content_hash FROM stored_days WHERE report_date = ?", (report_date,)
+                ).fetchone()
+                if row is not None and row[0] == content_hash:
+                    return False
+
+        columns = [col for col in df.columns if col in STORE_COLUMNS and col != 'Report_Date']
+        values = [_sql_values(df[col]) for col in columns]
+        rows = [row + (report_date,) for row in zip(*values)] if columns else []
+        placeholders = ", ".join("?" * (len(columns) + 1))
+        names = ", ".join(f'"{col}"' for col in columns + ['Report_Date'])
+
+        with self.lock:
+            # One transaction, so readers never see a day half replaced
+            with self.conn:
+                self.conn.execute('DELETE FROM daily_reports WHERE "Report_Date" = ?', (report_date,))
+                self.conn.executemany(f"INSERT INTO daily_reports ({names}) VALUES ({placeholders})", rows)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO stored_days VALUES (?, ?, ?)", (report_date, content_hash, len(rows))
+                )
+        return True
+
+    def summary(self) -> Dict[str, object]:
+        """Number of stored days and rows, and the date span"""
+        with self.lock:
+            days, rows, first, last = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(row_count), 0), MIN(report_date), MAX(report_date) FROM stored_days"
+            ).fetchone()
+        return {'days': days, 'rows': rows, 'first': first, 'last': last}
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Inspect the time series store")
+    parser.add_argument('--store', type=Path, default=Path("us_covid_data") / TIMESERIES_STORE_FILE,
+                        help="Path of the store database")
+    args = parser.parse_args()
+
+    if not args.store.exists():
+        print(f"No store at {args.store}")
+        return
+
+    store = TimeSeriesStore(args.store)
+    summary = store.summary()
+    print(f"{summary['days']} days, {summary['rows']} rows ({summary['first']} to {summary['last']})")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
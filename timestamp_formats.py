@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Last_Update Timestamp Formats
+-----------------------------
+Registry of the timestamp formats the JHU CSSE daily reports have used for
+Last_Update over the years. The format of a file is detected once from a small
+sample of its values, then the whole column is parsed vectorized with that
+exact format instead of letting pandas guess element by element. Values that
+do not match are counted in the fetch metrics rather than silently dropped.
+"""
+
+import logging
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from retry_policy import FetchMetrics
+
+logger = logging.getLogger("us_covid_fetcher.timestamps")
+
+# Known Last_Update layouts, most recent first
+TIMESTAMP_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',     # 2021-01-02 05:30:44
+    '%Y-%m-%dT%H:%M:%SZ',    # 2020-04-20T23:36:47Z
+    '%Y-%m-%dT%H:%M:%S',     # 2020-02-01T19:43:03
+    '%Y-%m-%dT%H:%M:%S.%fZ', # 2020-04-20T23:36:47.123Z
+    '%Y-%m-%d %H:%M',        # 2020-03-22 23:45
+    '%m/%d/%Y %H:%M',        # 1/22/2020 17:00
+    '%m/%d/%y %H:%M',        # 3/22/20 23:45
+    '%m/%d/%Y %H:%M:%S',     # 2/1/2020 19:43:03
+]
+SAMPLE_SIZE = 20
+
+
+class TimestampFormatRegistry:
+    """
+    Detects which known format a Last_Update column uses and parses it with that format.
+
+    The format that matched the previous file is tried first, so in a run over
+    consecutive days detection normally costs a single parse of the sample.
+    """
+
+    def __init__(self, formats: List[str] = None, sample_size: int = SAMPLE_SIZE):
+        self.formats = list(formats or TIMESTAMP_FORMATS)
+        self.sample_size = sample_size
+        self.last_format: Optional[str] = None
+
+    def _candidates(self) -> List[str]:
+        last = self.last_format
+        return [last] + [fmt for fmt in self.formats if fmt != last] if last else self.formats
+
+    def detect(self, values: pd.Series) -> Optional[str]:
+        """Return the known format that parses the most sampled values, or None if none parses any"""
+        # The first few non-blank values are enough; a file sticks to one format
+        sample = [value for value in values.iloc[:self.sample_size * 2].tolist() if value][:self.sample_size]
+        if not sample:
+            return None
+
+        best_format, best_hits = None, 0
+        for fmt in self._candidates():
+            hits = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+            if hits == len(sample):
+                best_format = fmt
+                break
+            if hits > best_hits:
+                best_format, best_hits = fmt, hits
+
+        if best_format:
+            self.last_format = best_format
+        return best_format
+
+    def parse(self, values: pd.Series, metrics: FetchMetrics = None) -> Tuple[pd.Series, Optional[str]]:
+        """
+        Parse a column of timestamps with its detected format.
+
+        Blank values become NaT. Non-blank values that do not match the detected
+        format are also set to NaT and counted as 'timestamps_unparsed'; a column
+        in no known format is parsed per element and counted as 'timestamp_format_unknown'.
+
+        Args:
+            values: Column of timestamp strings
+            metrics: Where to count parse failures (optional)
+
+        Returns:
+            Parsed column and the format used (None if it had to be guessed)
+        """
+        fmt = self.detect(values)
+        if fmt is None and (values != '').any():
+            logger.warning(f"Timestamps in no known format (e.g. {values[values != ''].iloc[0]!r}), parsing per element")
+            if metrics:
+                metrics.increment('timestamp_format_unknown')
+            parsed = pd.to_datetime(values, format='mixed', errors='coerce')
+        else:
+            parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+
+        unparsed = int((parsed.isna() & (values != '')).sum()) if parsed.hasnans else 0
+        if unparsed:
+            logger.warning(f"{unparsed} timestamps could not be parsed" + (f" with format {fmt!r}" if fmt else ""))
+            if metrics:
+                metrics.increment('timestamps_unparsed', unparsed)
+        return parsed, fmt